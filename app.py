@@ -11,38 +11,57 @@ import sys
 import os
 import json
 import logging
+import logging.handlers
+import multiprocessing
+import queue
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict, Any
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, 
-    QWidget, QFileDialog, QMessageBox, QAction, QMenuBar,
-    QToolBar, QStatusBar, QSplitter, QListWidget, QLabel,
-    QSlider, QPushButton, QCheckBox, QSpinBox, QComboBox,
-    QGroupBox, QGridLayout, QFrame
+    QWidget, QFileDialog, QMessageBox, QAction,
+    QStatusBar, QSplitter, QListWidget, QListWidgetItem, QLabel,
+    QPushButton, QCheckBox, QGroupBox, QGridLayout
 )
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QThread, QMutex, QSize
-from PyQt5.QtGui import QIcon, QPixmap, QPainter, QPen, QBrush, QColor, QFont
+from PyQt5.QtCore import Qt, QSettings, QByteArray
 
 from viewer.canvas import ImageCanvas
-from viewer.dicom_loader import DICOMLoader
-from viewer.image_loader import ImageLoader
 from viewer.json_io import JSONIO
-from viewer.tools import Tools
+from viewer.prefetcher import Prefetcher
+from viewer.tools import Tools, SUPPORTED_EXTENSIONS
 
-# 로그 디렉터리 생성
-os.makedirs('logs', exist_ok=True)
-
-# 로깅 설정
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/app.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# 로깅 설정 (UI 스레드는 큐에 넣기만 하고, 파일/콘솔 출력은 main()에서 시작하는 리스너 스레드가 담당)
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 logger = logging.getLogger(__name__)
 
+# 이전/다음으로 미리 로드할 파일 수 (각 방향)
+PREFETCH_RADIUS = 2
+
+
+def start_log_listener() -> logging.handlers.QueueListener:
+    """로그 큐를 파일과 콘솔로 내보내는 리스너 스레드 시작
+
+    큐 핸들러는 리스너가 도는 경우에만 붙임 (import만 하는 프로세스 풀 워커 등에서
+    아무도 비우지 않는 큐에 로그가 쌓이지 않도록)
+    """
+    # 로그 디렉터리 생성 (FileHandler가 파일을 열기 전에, 없을 때만)
+    if not os.path.isdir('logs'):
+        os.makedirs('logs', exist_ok=True)
+        
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.FileHandler('logs/app.log', encoding='utf-8')
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler)
+    listener.start()
+    
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+    return listener
+
 
 class KeypointLabeler(QMainWindow):
     """키포인트 라벨링 메인 윈도우"""
@@ -50,13 +69,25 @@ class KeypointLabeler(QMainWindow):
     def __init__(self):
         super().__init__()
         self.current_file = None
+        self.current_json_path = None  # 현재 파일의 JSON 경로 (로드 시 한 번 계산)
         self.current_folder = None
         self.folder_files = []
         self.current_index = -1
         self.keypoints = []
         self.auto_save = True
+        self._dirty = set()  # 디스크와 내용이 다른 파일 경로
+        self._unsaved_keypoints = {}  # 현재 파일이 아닌 dirty 파일의 키포인트
+        self._json_paths = {}  # 폴더 파일 경로 -> JSON 경로
+        self.qsettings = QSettings('KeypointLabeler', 'App')
         self.settings = self.load_settings()
         
+        # 이전/다음 파일 미리 로드 (DICOM 디코딩은 GIL을 잡으므로 프로세스 풀에서 병렬 처리)
+        # Qt/OpenCV/로깅 스레드가 도는 프로세스를 fork하면 워커가 멈출 수 있으므로 모든 플랫폼에서 spawn 사용
+        self.prefetch_pool = ProcessPoolExecutor(max_workers=min(4, os.cpu_count() or 1),
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        self.prefetcher = Prefetcher(capacity=2 * PREFETCH_RADIUS + 2, pool=self.prefetch_pool, parent=self)
+        self.prefetcher.start()
+        
         self.init_ui()
         self.load_recent_folder()
         
@@ -64,6 +95,9 @@ class KeypointLabeler(QMainWindow):
         """UI 초기화"""
         self.setWindowTitle("키포인트 라벨러 v1.1.1")
         self.setGeometry(100, 100, 1400, 900)
+        geometry = self.settings.get('geometry')
+        if geometry:
+            self.restoreGeometry(geometry)
         
         # 중앙 위젯
         central_widget = QWidget()
@@ -305,8 +339,10 @@ class KeypointLabeler(QMainWindow):
         # 캔버스 시그널
         self.canvas.point_added.connect(self.add_keypoint)
         self.canvas.point_moved.connect(self.move_keypoint)
+        self.canvas.points_moved.connect(self.on_points_batch)
         self.canvas.point_selected.connect(self.select_keypoint)
         self.canvas.zoom_changed.connect(self.update_zoom_label)
+        self.canvas.image_load_failed.connect(self.on_image_load_failed)
         
         # 사이드 패널 시그널
         self.keypoint_list.itemSelectionChanged.connect(self.on_keypoint_selection_changed)
@@ -350,25 +386,34 @@ class KeypointLabeler(QMainWindow):
     def load_file(self, file_path: str):
         """파일 로드"""
         try:
+            # 저장하지 않은 편집 내용은 메모리에 보관
+            if self.current_file in self._dirty:
+                self._unsaved_keypoints[self.current_file] = self.keypoints.copy()
+                
+            cached = self.prefetcher.take(str(file_path))
             file_path = Path(file_path)
             
-            # 이미지 로드
-            if file_path.suffix.lower() == '.dcm':
-                self.canvas.load_dicom(str(file_path))
+            # 이미지 로드 (미리 로드된 경우 디코딩 생략, 아니면 백그라운드에서 디코딩)
+            if cached is not None:
+                self.canvas.set_image_data(*cached)
             else:
-                self.canvas.load_image(str(file_path))
+                self.canvas.load_file_async(str(file_path))
             
             # JSON 로드
-            json_path = file_path.with_suffix('.json')
-            if json_path.exists():
-                self.keypoints = JSONIO.load_keypoints(str(json_path))
+            json_path = self._json_paths.get(str(file_path)) or Tools.json_path_for(str(file_path))
+            if str(file_path) in self._unsaved_keypoints:
+                self.keypoints = self._unsaved_keypoints.pop(str(file_path))
+            elif os.path.exists(json_path):
+                self.keypoints = JSONIO.load_keypoints(json_path)
             else:
                 self.keypoints = []
             
             self.current_file = str(file_path)
+            self.current_json_path = json_path
             self.update_keypoint_list()
             self.canvas.set_keypoints(self.keypoints)
             self.update_status()
+            self.prefetch_neighbors()
             
             # 최근 폴더 저장 (문자열로 전달)
             self.save_recent_folder(str(file_path.parent))
@@ -377,23 +422,27 @@ class KeypointLabeler(QMainWindow):
             QMessageBox.critical(self, "오류", f"파일을 로드할 수 없습니다: {str(e)}")
             logger.error(f"파일 로드 오류: {e}")
             
+    def on_image_load_failed(self, file_path: str, message: str):
+        """백그라운드 이미지 로드 실패"""
+        QMessageBox.critical(self, "오류", f"파일을 로드할 수 없습니다: {message}")
+        logger.error(f"파일 로드 오류 {file_path}: {message}")
+        
     def load_folder(self, folder_path: str):
         """폴더 로드"""
         try:
             folder_path = Path(folder_path)
             self.current_folder = str(folder_path)  # Path 객체를 문자열로 변환
             
-            # 지원 파일 확장자
-            extensions = {'.dcm', '.jpg', '.jpeg', '.png'}
+            # 파일 목록 생성 (scandir의 DirEntry는 파일 종류를 캐시하므로 추가 stat 없음)
+            self.folder_files = []
+            with os.scandir(folder_path) as entries:
+                for entry in entries:
+                    if entry.name.lower().endswith(SUPPORTED_EXTENSIONS) and entry.is_file():
+                        self.folder_files.append(entry.path)
             
-            # 파일 목록 생성
-            self.folder_files = [
-                str(f) for f in folder_path.iterdir()
-                if f.is_file() and f.suffix.lower() in extensions
-            ]
-            
-            # 자연 정렬
-            self.folder_files.sort(key=lambda x: [int(c) if c.isdigit() else c.lower() for c in re.split(r'(\d+)', x)])
+            # 자연 정렬 (파일명 기준)
+            self.folder_files = Tools.natural_sort_paths(self.folder_files)
+            self._json_paths = {p: Tools.json_path_for(p) for p in self.folder_files}
             
             if self.folder_files:
                 self.current_index = 0
@@ -408,6 +457,19 @@ class KeypointLabeler(QMainWindow):
             QMessageBox.critical(self, "오류", f"폴더를 로드할 수 없습니다: {str(e)}")
             logger.error(f"폴더 로드 오류: {e}")
             
+    def prefetch_neighbors(self):
+        """현재 파일의 다음/이전 파일 미리 로드 요청"""
+        if not self.folder_files or self.current_index < 0:
+            return
+        # 가까운 파일부터 (다음, 이전, 다음+1, 이전-1, ...)
+        neighbors = [
+            self.folder_files[i]
+            for d in range(1, PREFETCH_RADIUS + 1)
+            for i in (self.current_index + d, self.current_index - d)
+            if 0 <= i < len(self.folder_files)
+        ]
+        self.prefetcher.request(neighbors)
+            
     def prev_file(self):
         """이전 파일"""
         if self.folder_files and self.current_index > 0:
@@ -423,8 +485,8 @@ class KeypointLabeler(QMainWindow):
             self.load_file(self.folder_files[self.current_index])
             
     def save_current_if_needed(self):
-        """필요시 현재 파일 저장"""
-        if self.auto_save and self.current_file and self.keypoints:
+        """필요시 현재 파일 저장 (변경된 경우만)"""
+        if self.auto_save and self.current_file in self._dirty and self.keypoints:
             self.save_current()
             
     def save_current(self):
@@ -433,27 +495,37 @@ class KeypointLabeler(QMainWindow):
             return
             
         try:
-            json_path = Path(self.current_file).with_suffix('.json')
-            JSONIO.save_keypoints(str(json_path), self.keypoints)
-            self.status_bar.showMessage(f"저장됨: {json_path.name}", 3000)
+            json_path = self.current_json_path
+            if JSONIO.save_keypoints(json_path, self.keypoints):
+                self._dirty.discard(self.current_file)
+                self._unsaved_keypoints.pop(self.current_file, None)
+                self.status_bar.showMessage(f"저장됨: {os.path.basename(json_path)}", 3000)
             
         except Exception as e:
             QMessageBox.critical(self, "오류", f"저장할 수 없습니다: {str(e)}")
             logger.error(f"저장 오류: {e}")
             
     def save_all(self):
-        """전체 파일 저장"""
-        if not self.folder_files:
+        """전체 파일 저장 (변경된 파일만)"""
+        if not self._dirty:
             return
             
         saved_count = 0
-        for file_path in self.folder_files:
+        for file_path in list(self._dirty):
             try:
-                json_path = Path(file_path).with_suffix('.json')
-                # 각 파일의 키포인트를 로드하여 저장
-                if json_path.exists():
-                    keypoints = JSONIO.load_keypoints(str(json_path))
-                    JSONIO.save_keypoints(str(json_path), keypoints)
+                if file_path == self.current_file:
+                    keypoints = self.keypoints
+                    json_path = self.current_json_path
+                else:
+                    keypoints = self._unsaved_keypoints.get(file_path)
+                    if keypoints is None:
+                        self._dirty.discard(file_path)
+                        continue
+                    json_path = self._json_paths.get(file_path) or Tools.json_path_for(file_path)
+                    
+                if JSONIO.save_keypoints(json_path, keypoints):
+                    self._dirty.discard(file_path)
+                    self._unsaved_keypoints.pop(file_path, None)
                     saved_count += 1
             except Exception as e:
                 logger.error(f"파일 저장 오류 {file_path}: {e}")
@@ -464,15 +536,37 @@ class KeypointLabeler(QMainWindow):
         """키포인트 추가"""
         # canvas의 키포인트를 메인 앱과 동기화
         self.keypoints = self.canvas.keypoints.copy()
-        self.update_keypoint_list()
-        
-
+        self._mark_dirty()
+        if index != self.keypoint_list.count():
+            self.update_keypoint_list()
+            return
+        # 새 항목만 추가 (전체 리스트 재생성 없음)
+        self.keypoint_list.addItem(self._create_keypoint_item(index, x, y))
+        self.keypoint_list.setCurrentRow(index)
         
     def move_keypoint(self, index: int, x: int, y: int):
         """키포인트 이동"""
-        # canvas의 키포인트를 메인 앱과 동기화
-        self.keypoints = self.canvas.keypoints.copy()
-        self.update_keypoint_list()
+        self._mark_dirty()
+        if index < 0 or len(self.canvas.keypoints) != self.keypoint_list.count():
+            # 실행 취소 등 전체 변경 알림 (index == -1): 전체 동기화
+            self.keypoints = self.canvas.keypoints.copy()
+            self.update_keypoint_list()
+            return
+        # 이동한 항목만 갱신
+        self.keypoints[index] = [x, y]
+        self._update_keypoint_item(index)
+            
+    def on_points_batch(self, changes: Dict[int, Tuple[int, int]]):
+        """드래그 중 묶어서 전달된 이동을 한 번에 반영"""
+        self._mark_dirty()
+        if len(self.canvas.keypoints) != self.keypoint_list.count():
+            self.keypoints = self.canvas.keypoints.copy()
+            self.update_keypoint_list()
+            return
+        for index, (x, y) in changes.items():
+            if 0 <= index < len(self.keypoints):
+                self.keypoints[index] = [x, y]
+                self._update_keypoint_item(index)
             
     def select_keypoint(self, index: int):
         """키포인트 선택"""
@@ -488,15 +582,18 @@ class KeypointLabeler(QMainWindow):
             self.canvas.save_state_for_undo('delete', {'index': current_row, 'point': deleted_point})
             
             del self.keypoints[current_row]
-            self.update_keypoint_list()
-            # set_keypoints 대신 직접 keypoints 업데이트 (undo 스택 보존)
-            self.canvas.keypoints = self.keypoints.copy()
-            self.canvas.selected_point = -1
-            self.canvas.update()
+            self._mark_dirty()
+            self.keypoint_list.takeItem(current_row)
+            # 뒤쪽 항목들의 번호만 갱신
+            for row in range(current_row, self.keypoint_list.count()):
+                self._update_keypoint_item(row)
+            # undo 스택은 보존
+            self.canvas.set_keypoints(self.keypoints.copy(), reset=False)
             
     def clear_all_keypoints(self):
         """모든 키포인트 삭제"""
         self.keypoints.clear()
+        self._mark_dirty()
         self.update_keypoint_list()
         self.canvas.set_keypoints(self.keypoints)
         
@@ -506,14 +603,39 @@ class KeypointLabeler(QMainWindow):
         if len(selected_rows) == 2:
             i, j = selected_rows
             self.keypoints[i], self.keypoints[j] = self.keypoints[j], self.keypoints[i]
-            self.update_keypoint_list()
-            self.canvas.set_keypoints(self.keypoints)
+            self._mark_dirty()
+            # 캔버스에서 교환 (실행 취소 스택에 기록되므로 앞선 추가/삭제 취소가 엉뚱한 점을 가리키지 않음)
+            self.canvas.swap_keypoints(i, j)
+            # 바뀐 두 항목만 갱신
+            for row in (i, j):
+                self._update_keypoint_item(row)
             
     def update_keypoint_list(self):
         """키포인트 리스트 업데이트"""
-        self.keypoint_list.clear()
-        for i, (x, y) in enumerate(self.keypoints):
-            self.keypoint_list.addItem(f"{i+1}: ({x}, {y})")
+        # 재구성 중 선택 변경 시그널과 다시 그리기를 막고, 항목은 한 번에 삽입
+        self.keypoint_list.setUpdatesEnabled(False)
+        self.keypoint_list.blockSignals(True)
+        try:
+            self.keypoint_list.clear()
+            self.keypoint_list.addItems([f"{i+1}: ({x}, {y})" for i, (x, y) in enumerate(self.keypoints)])
+            for i, (x, y) in enumerate(self.keypoints):
+                self.keypoint_list.item(i).setData(Qt.UserRole, (x, y))
+        finally:
+            self.keypoint_list.blockSignals(False)
+            self.keypoint_list.setUpdatesEnabled(True)
+            
+    def _create_keypoint_item(self, index: int, x: int, y: int) -> QListWidgetItem:
+        """키포인트 리스트 항목 생성"""
+        item = QListWidgetItem(f"{index+1}: ({x}, {y})")
+        item.setData(Qt.UserRole, (x, y))  # 순서 변경 시 텍스트 파싱 없이 좌표 복원
+        return item
+        
+    def _update_keypoint_item(self, row: int):
+        """키포인트 리스트의 한 항목만 갱신"""
+        x, y = self.keypoints[row]
+        item = self.keypoint_list.item(row)
+        item.setText(f"{row+1}: ({x}, {y})")
+        item.setData(Qt.UserRole, (x, y))
             
     def on_keypoint_selection_changed(self):
         """키포인트 선택 변경"""
@@ -523,18 +645,19 @@ class KeypointLabeler(QMainWindow):
             
     def on_keypoint_order_changed(self):
         """키포인트 순서 변경"""
-        # 리스트에서 새로운 순서로 키포인트 재정렬
-        new_keypoints = []
-        for i in range(self.keypoint_list.count()):
-            item_text = self.keypoint_list.item(i).text()
-            # "1: (x, y)" 형식에서 좌표 추출
-            coord_str = item_text.split(': ')[1].strip('()')
-            x, y = map(int, coord_str.split(', '))
-            new_keypoints.append([x, y])
-            
-        self.keypoints = new_keypoints
+        # 리스트에서 새로운 순서로 키포인트 재정렬 (항목에 저장된 좌표 사용)
+        self.keypoints = [
+            list(self.keypoint_list.item(i).data(Qt.UserRole))
+            for i in range(self.keypoint_list.count())
+        ]
+        self._mark_dirty()
         self.canvas.set_keypoints(self.keypoints)
         
+    def _mark_dirty(self):
+        """현재 파일을 변경됨으로 표시"""
+        if self.current_file:
+            self._dirty.add(self.current_file)
+        
     def set_auto_save(self, enabled: bool):
         """자동 저장 설정"""
         self.auto_save = enabled
@@ -566,43 +689,32 @@ class KeypointLabeler(QMainWindow):
             
     def load_settings(self) -> Dict[str, Any]:
         """설정 로드"""
+        if not self.qsettings.allKeys():
+            self.migrate_json_settings()
+        return {
+            'recent_folder': self.qsettings.value('recent_folder', '', type=str),
+            'geometry': self.qsettings.value('geometry', QByteArray(), type=QByteArray),
+        }
+        
+    def migrate_json_settings(self):
+        """이전 버전의 settings.json에서 최근 폴더를 QSettings로 한 번만 옮기기 (파일은 이후 사용하지 않음)"""
         try:
             if os.path.exists('settings.json'):
                 with open('settings.json', 'r', encoding='utf-8') as f:
                     content = f.read().strip()
-                    if content:  # 파일이 비어있지 않은 경우에만 파싱
-                        return json.loads(content)
-        except json.JSONDecodeError as e:
-            logger.error(f"설정 파일 JSON 파싱 오류: {e}")
-            # 손상된 설정 파일 백업 후 새로 시작
-            try:
-                if os.path.exists('settings.json'):
-                    os.rename('settings.json', 'settings.json.corrupted')
-                    logger.info("손상된 설정 파일을 settings.json.corrupted로 백업했습니다.")
-            except Exception as backup_error:
-                logger.error(f"설정 파일 백업 실패: {backup_error}")
+                recent_folder = json.loads(content).get('recent_folder') if content else None
+                if recent_folder:
+                    self.qsettings.setValue('recent_folder', str(recent_folder))
+                    logger.info("settings.json의 최근 폴더를 새 설정 저장소로 옮겼습니다.")
         except Exception as e:
-            logger.error(f"설정 로드 오류: {e}")
-        return {}
+            logger.error(f"settings.json 변환 오류: {e}")
         
-
     def save_settings(self):
-        """설정 저장"""
+        """설정 저장 (QSettings가 메모리에 보관하고 필요할 때 디스크에 동기화)"""
         try:
-            settings = {
-                'recent_folder': str(self.current_folder) if self.current_folder else None,  # Path를 문자열로 변환
-                'auto_save': self.auto_save,
-                'window_geometry': {
-                    'x': self.geometry().x(),
-                    'y': self.geometry().y(),
-                    'width': self.geometry().width(),
-                    'height': self.geometry().height()
-                }
-            }
-            
-            with open('settings.json', 'w', encoding='utf-8') as f:
-                json.dump(settings, f, ensure_ascii=False, indent=2)
-                
+            self.qsettings.setValue('recent_folder', self.current_folder or '')
+            self.qsettings.setValue('auto_save', self.auto_save)
+            self.qsettings.setValue('geometry', self.saveGeometry())
         except Exception as e:
             logger.error(f"설정 저장 오류: {e}")
             
@@ -625,11 +737,16 @@ class KeypointLabeler(QMainWindow):
         """앱 종료 시 이벤트"""
         self.save_current_if_needed()
         self.save_settings()
+        self.qsettings.sync()
+        self.prefetcher.stop()
+        self.prefetch_pool.shutdown(wait=False)
         event.accept()
 
 
 def main():
     """메인 함수"""
+    log_listener = start_log_listener()
+    
     app = QApplication(sys.argv)
     app.setApplicationName("Keypoint Labeler")
     app.setApplicationVersion("1.1.1")
@@ -640,9 +757,11 @@ def main():
     window = KeypointLabeler()
     window.show()
     
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    log_listener.stop()  # 남은 로그를 모두 기록한 뒤 종료
+    sys.exit(exit_code)
 
 
 if __name__ == '__main__':
-    import re
+    multiprocessing.freeze_support()  # PyInstaller 실행 파일에서 프로세스 풀 사용
     main()
@@ -7,6 +7,7 @@ from .canvas import ImageCanvas
 from .dicom_loader import DICOMLoader
 from .image_loader import ImageLoader
 from .json_io import JSONIO
+from .prefetcher import Prefetcher
 from .tools import Tools
 
 __all__ = [
@@ -14,5 +15,6 @@ __all__ = [
     'DICOMLoader', 
     'ImageLoader',
     'JSONIO',
+    'Prefetcher',
     'Tools'
 ]
@@ -3,14 +3,45 @@ Image Canvas for Keypoint Labeler
 키포인트 라벨링을 위한 이미지 캔버스
 """
 
+import logging
+from collections import deque
 import numpy as np
 from typing import List, Tuple, Optional
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QSlider
-from PyQt5.QtCore import Qt, pyqtSignal, QRect, QPoint, QSize
-from PyQt5.QtGui import QPixmap, QPainter, QPen, QBrush, QColor, QFont, QMouseEvent, QWheelEvent, QKeyEvent
+from PyQt5.QtCore import (Qt, pyqtSignal, QObject, QRunnable, QThreadPool, QRect, QRectF, QMargins, QPoint, QSize,
+                          QTimer, QElapsedTimer)
+from PyQt5.QtGui import (QPixmap, QPixmapCache, QPainter, QPen, QBrush, QColor, QFont, QFontMetrics,
+                         QStaticText, QMouseEvent, QWheelEvent, QKeyEvent)
 
 from .dicom_loader import DICOMLoader
 from .image_loader import ImageLoader
+from .prefetcher import Prefetcher
+
+logger = logging.getLogger(__name__)
+
+
+class _LoadSignals(QObject):
+    """백그라운드 로드 결과 전달용 시그널"""
+    finished = pyqtSignal(int, object, object)  # request id, image, dicom_loader
+    failed = pyqtSignal(int, str)  # request id, error message
+
+
+class _ImageLoadTask(QRunnable):
+    """스레드 풀에서 이미지 파일 하나를 디코딩하는 작업"""
+    
+    def __init__(self, request_id: int, file_path: str, signals: _LoadSignals):
+        super().__init__()
+        self.request_id = request_id
+        self.file_path = file_path
+        self.signals = signals
+        
+    def run(self):
+        try:
+            image, dicom_loader = Prefetcher.decode(self.file_path)
+        except Exception as e:
+            self.signals.failed.emit(self.request_id, str(e))
+            return
+        self.signals.finished.emit(self.request_id, image, dicom_loader)
 
 
 class ImageCanvas(QWidget):
@@ -19,14 +50,39 @@ class ImageCanvas(QWidget):
     # 시그널 정의
     point_added = pyqtSignal(int, int, int)  # index, x, y
     point_moved = pyqtSignal(int, int, int)  # index, x, y
+    points_moved = pyqtSignal(dict)  # {index: (x, y)} - 드래그 중 변경을 프레임 단위로 묶어서 전달
     point_selected = pyqtSignal(int)  # index
     zoom_changed = pyqtSignal(int)  # zoom percentage
+    image_load_failed = pyqtSignal(str, str)  # file path, error message
+    
+    # 키포인트 모양/라벨이 중심에서 뻗는 최대 범위 (left, top, right, bottom)
+    KEYPOINT_MARGIN = QMargins(16, 28, 56, 16)
+    
+    # DICOM Window/Level 프리셋 (level, width)
+    DICOM_PRESETS = {
+        'Soft Tissue': (40, 400),
+        'Bone': (300, 1500),
+        'Lung': (-600, 1600),
+        'General': (0, 255)
+    }
+    
+    # 방향키 → 단위 이동 (dx, dy)
+    ARROW_DIRECTIONS = {
+        Qt.Key_Left: (-1, 0),
+        Qt.Key_Right: (1, 0),
+        Qt.Key_Up: (0, -1),
+        Qt.Key_Down: (0, 1)
+    }
     
     def __init__(self):
         super().__init__()
         self.image = None
         self.pixmap = None
-        self.keypoints = []
+        self._clip_w = self._clip_h = 9999  # 키포인트 좌표 상한 (pixmap 크기 - 1)
+        # 키포인트 (N, 2) int32 배열, 외부에는 keypoints 리스트로 제공
+        # _kp는 용량을 두 배씩 늘리는 버퍼 _kp_buf의 앞부분 view (추가할 때마다 재할당하지 않음)
+        self._kp_buf = np.empty((16, 2), dtype=np.int32)
+        self._kp = self._kp_buf[:0]
         self.selected_point = -1
         self.dragging = False
         self.show_labels = True
@@ -34,15 +90,93 @@ class ImageCanvas(QWidget):
         self.pan_offset = QPoint(0, 0)
         self.drag_start_position = None  # 드래그 시작 위치 저장
         
+        # 화면상 이미지 영역 캐시 (좌표 변환마다 다시 계산하지 않도록)
+        self._geometry_key = None
+        self._geometry = (0, 0, 0, 0)
+        # 이미지 좌표 ↔ 화면 좌표 변환 (화면 = 이미지 * scale + offset), 그리기와 클릭 판정이 공유
+        self._screen_offset = np.zeros(2, dtype=np.int32)
+        self._screen_scale = np.ones(2)
+        
+        # 화면 크기로 스케일링한 pixmap 캐시 (축소/소폭 확대 시 매 프레임 리샘플링 방지)
+        self._scaled_pixmap = None
+        self._scaled_key = None
+        
+        # 줌/패닝 중에는 빠른 스케일링으로 그리고, 잠시 멈추면 부드러운 스케일링으로 다시 그림
+        self._interacting = False
+        self._smooth_timer = QTimer(self)
+        self._smooth_timer.setSingleShot(True)
+        self._smooth_timer.setInterval(120)
+        self._smooth_timer.timeout.connect(self._end_interaction)
+        
         # DICOM 관련
         self.dicom_loader = None
         self.window_level = 0
         self.window_width = 255
         self.is_dicom = False
         
+        # 마지막으로 pixmap을 만든 원본 이미지 (같으면 변환 생략)
+        self._display_source = None
+        
+        # 드래그 이동 알림 병합 (마우스 이동마다 시그널을 보내지 않고 최대 프레임당 1회)
+        self._pending_moves = {}
+        self._move_timer = QTimer(self)
+        self._move_timer.setSingleShot(True)
+        self._move_timer.setInterval(16)
+        self._move_timer.timeout.connect(self.flush_pending_moves)
+        
+        # 방향키 이동 병합 (이동과 실행 취소 기록은 키마다, 다시 그리기/시그널은 이벤트 루프 한 바퀴마다 한 번에)
+        self._pending_nudge = {}
+        self._nudge_rect = QRect()
+        self._nudge_timer = QTimer(self)
+        self._nudge_timer.setSingleShot(True)
+        self._nudge_timer.setInterval(0)
+        self._nudge_timer.timeout.connect(self.flush_pending_nudge)
+        
+        # 드래그/패닝 중 다시 그리기 제한 (마우스 이벤트가 아무리 잦아도 최대 프레임당 1회)
+        self._pending_rect = QRect()
+        self._pending_scroll = [0, 0]
+        self._frame_clock = QElapsedTimer()
+        self._frame_clock.start()
+        self._frame_timer = QTimer(self)
+        self._frame_timer.setSingleShot(True)
+        self._frame_timer.setInterval(16)
+        self._frame_timer.timeout.connect(self.flush_pending_frame)
+        
+        # Ctrl + 키 단축키 (+ 키는 Shift+= 로도 들어옴)
+        self._ctrl_shortcuts = {
+            Qt.Key_Z: self.undo,
+            Qt.Key_Plus: self.zoom_in,
+            Qt.Key_Equal: self.zoom_in,
+            Qt.Key_Minus: self.zoom_out,
+            Qt.Key_0: self.reset_view
+        }
+        
         # 이미지 로더
         self.image_loader = ImageLoader()
         
+        # 백그라운드 로드 (가장 최근 요청의 결과만 반영)
+        self._loader_pool = QThreadPool.globalInstance()
+        self._load_request_id = 0
+        self._loading_path = None
+        self._load_signals = _LoadSignals(self)
+        self._load_signals.finished.connect(self._on_image_loaded)
+        self._load_signals.failed.connect(self._on_image_load_failed)
+        
+        # 키포인트 그리기 도구 (그릴 때마다 새로 만들지 않도록 미리 생성)
+        self._point_pen = QPen(QColor(255, 0, 0), 2)  # 빨간색
+        self._point_brush = QBrush(QColor(255, 0, 0))
+        self._selected_pen = QPen(QColor(255, 255, 0), 3)  # 노란색 (선택됨)
+        self._selected_brush = QBrush(QColor(255, 255, 0))
+        self._label_pen = QPen(QColor(255, 255, 255), 1)
+        self._label_font = QFont("Arial", 10)
+        self._background_color = QColor(50, 50, 50)
+        # 번호 라벨 텍스트 레이아웃 캐시 (drawStaticText는 좌상단 기준이므로 기준선까지의 높이를 뺌)
+        self._label_texts: List[QStaticText] = []
+        self._label_ascent = QFontMetrics(self._label_font).ascent()
+        # 현재 줌 팩터의 (일반, 선택) 글리프와 라벨 위치 - 줌이 바뀔 때만 다시 계산
+        self._glyph_key = None
+        self._glyphs = None
+        
         # UI 설정
         self.setMinimumSize(400, 300)
         self.setMouseTracking(True)
@@ -53,12 +187,13 @@ class ImageCanvas(QWidget):
         self.mouse_mode = 'select'  # 'select', 'pan', 'window_level'
         
         # 실행 취소 기능
-        self.undo_stack = []  # 실행 취소 스택
         self.max_undo_steps = 50  # 최대 실행 취소 단계
+        self.undo_stack = deque(maxlen=self.max_undo_steps)  # 실행 취소 스택 (가득 차면 가장 오래된 단계부터 자동 폐기)
         self.last_added_point = -1  # 마지막으로 추가된 점의 인덱스
         
     def load_image(self, file_path: str):
         """일반 이미지 파일 로드"""
+        self._cancel_pending_load()
         try:
             self.image = self.image_loader.load_image(file_path)
             self.is_dicom = False
@@ -69,16 +204,17 @@ class ImageCanvas(QWidget):
             
     def load_dicom(self, file_path: str):
         """DICOM 파일 로드"""
+        self._cancel_pending_load()
         try:
             self.dicom_loader = DICOMLoader(file_path)
             self.image = self.dicom_loader.get_image()
             self.is_dicom = True
             
-            # 디버깅: 이미지 정보 출력
-            print(f"DICOM 로드 완료: {file_path}")
-            print(f"이미지 shape: {self.image.shape}")
-            print(f"이미지 dtype: {self.image.dtype}")
-            print(f"이미지 min/max: {self.image.min()}/{self.image.max()}")
+            # 디버깅: 이미지 정보 출력 (min/max는 배열 전체를 훑으므로 DEBUG일 때만 계산)
+            logger.debug("DICOM 로드 완료: %s", file_path)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("이미지 shape: %s, dtype: %s, min/max: %s/%s",
+                             self.image.shape, self.image.dtype, self.image.min(), self.image.max())
             
             # DICOM 윈도우/레벨 설정
             self.window_level = self.dicom_loader.get_default_window_level()
@@ -86,39 +222,160 @@ class ImageCanvas(QWidget):
             
             self.update_display()
         except Exception as e:
-            print(f"DICOM 로드 오류: {e}")
+            logger.error("DICOM 로드 오류: %s", e)
             raise Exception(f"DICOM 로드 실패: {e}")
             
+    def load_file_async(self, file_path: str):
+        """이미지/DICOM 파일을 스레드 풀에서 디코딩 (완료되면 표시)"""
+        self._load_request_id += 1
+        self._loading_path = file_path
+        
+        # 로드가 끝날 때까지 이전 이미지를 표시하지 않음 (다른 파일에 점이 찍히지 않도록)
+        self.image = None
+        self._set_pixmap(None)
+        self._display_source = None
+        self.update()
+        
+        self._loader_pool.start(_ImageLoadTask(self._load_request_id, file_path, self._load_signals))
+        
+    def _on_image_loaded(self, request_id: int, image: np.ndarray, dicom_loader: Optional[DICOMLoader]):
+        """백그라운드 로드 완료"""
+        if request_id != self._load_request_id:
+            return  # 이미 다른 파일로 이동함
+        self._loading_path = None
+        self.set_image_data(image, dicom_loader)
+        
+    def _cancel_pending_load(self):
+        """진행 중인 백그라운드 로드 결과를 무시하도록 표시"""
+        self._load_request_id += 1
+        self._loading_path = None
+        
+    def _on_image_load_failed(self, request_id: int, message: str):
+        """백그라운드 로드 실패"""
+        if request_id != self._load_request_id:
+            return
+        file_path, self._loading_path = self._loading_path, None
+        self.image_load_failed.emit(file_path, message)
+        
+    def set_image_data(self, image: np.ndarray, dicom_loader: Optional[DICOMLoader] = None):
+        """미리 디코딩된 이미지 표시 (dicom_loader가 있으면 DICOM으로 처리)"""
+        self._cancel_pending_load()
+        self.image = image
+        self.dicom_loader = dicom_loader
+        self.is_dicom = dicom_loader is not None
+        
+        if self.is_dicom:
+            # DICOM 윈도우/레벨 설정
+            self.window_level = dicom_loader.get_default_window_level()
+            self.window_width = dicom_loader.get_default_window_width()
+            
+        self.update_display()
+        
     def update_display(self):
         """화면 업데이트"""
         if self.image is None:
-            print("이미지가 None입니다")
+            logger.warning("이미지가 None입니다")
+            return
+            
+        # 같은 이미지면 화면에 이미 같은 pixmap이 있으므로 변환도 다시 그리기도 생략
+        if self.pixmap is not None and self._display_source is self.image:
             return
             
         # 이미지를 QPixmap으로 변환
         if self.is_dicom:
             # DICOM 이미지는 이미 preprocess_dicom으로 처리됨
-            print(f"DICOM 이미지 변환: shape={self.image.shape}, dtype={self.image.dtype}")
-            self.pixmap = self.image_loader.numpy_to_qpixmap(self.image)
+            logger.debug("DICOM 이미지 변환: shape=%s, dtype=%s", self.image.shape, self.image.dtype)
+            pixmap = self.image_loader.numpy_to_qpixmap(self.image)
         else:
             # 일반 이미지
-            self.pixmap = self.image_loader.numpy_to_qpixmap(self.image)
+            pixmap = self.image_loader.numpy_to_qpixmap(self.image)
             
-        print(f"QPixmap 생성 완료: {self.pixmap.width()}x{self.pixmap.height()}")
+        self._set_pixmap(pixmap)
+        self._display_source = self.image
+        logger.debug("QPixmap 생성 완료: %dx%d", self.pixmap.width(), self.pixmap.height())
         self.update()
         
-    def set_keypoints(self, keypoints: List[List[int]]):
-        """키포인트 설정"""
+    def _set_pixmap(self, pixmap: Optional[QPixmap]):
+        """표시 pixmap 교체 (좌표 범위 상한도 함께 갱신)"""
+        self.pixmap = pixmap
+        self._scaled_pixmap = self._scaled_key = None
+        if pixmap is not None:
+            self._clip_w = pixmap.width() - 1
+            self._clip_h = pixmap.height() - 1
+        else:
+            self._clip_w = self._clip_h = 9999
+            
+    @property
+    def keypoints(self) -> List[List[int]]:
+        """키포인트 목록 ([x, y] 리스트의 사본)"""
+        return self._kp.tolist()
+        
+    @keypoints.setter
+    def keypoints(self, keypoints):
+        """키포인트 목록 설정 (리스트 또는 (N, 2) 배열)"""
+        points = np.asarray(keypoints, dtype=np.int32).reshape(-1, 2)
+        n = len(points)
+        self._kp_buf = np.empty((max(16, 2 * n), 2), dtype=np.int32)
+        self._kp_buf[:n] = points
+        self._kp = self._kp_buf[:n]
+        
+    def _append_keypoint(self, x: int, y: int):
+        """키포인트 추가 (버퍼가 차면 용량 두 배로 확장)"""
+        n = len(self._kp)
+        if n == len(self._kp_buf):
+            buf = np.empty((2 * n, 2), dtype=np.int32)
+            buf[:n] = self._kp
+            self._kp_buf = buf
+        self._kp_buf[n] = (x, y)
+        self._kp = self._kp_buf[:n + 1]
+        
+    def _remove_keypoint(self, index: int):
+        """키포인트 삭제 (뒤쪽 포인트를 제자리에서 한 칸씩 당김)"""
+        n = len(self._kp)
+        self._kp_buf[index:n - 1] = self._kp_buf[index + 1:n]
+        self._kp = self._kp_buf[:n - 1]
+        
+    def _insert_keypoint(self, index: int, x: int, y: int):
+        """키포인트 삽입 (뒤쪽 포인트를 제자리에서 한 칸씩 밀어냄)"""
+        n = len(self._kp)
+        self._append_keypoint(x, y)  # 필요하면 버퍼 확장
+        self._kp_buf[index + 1:n + 1] = self._kp_buf[index:n].copy()
+        self._kp_buf[index] = (x, y)
+        
+    def set_keypoints(self, keypoints: List[List[int]], reset: bool = True):
+        """키포인트 설정 (reset=False이면 실행 취소 스택 보존)"""
         self.keypoints = keypoints
         self.selected_point = -1
-        self.last_added_point = -1
-        self.clear_undo_stack()  # 새로운 이미지 로드 시 실행 취소 스택 초기화
+        self._pending_moves = {}  # 이전 키포인트 기준의 보류 이동은 폐기
+        self._move_timer.stop()
+        self._pending_nudge = {}
+        self._nudge_rect = QRect()
+        self._nudge_timer.stop()
+        if reset:
+            self.last_added_point = -1
+            self.clear_undo_stack()  # 새로운 이미지 로드 시 실행 취소 스택 초기화
         self.update()
         
+    def swap_keypoints(self, i: int, j: int):
+        """두 키포인트 교환 (실행 취소 가능)"""
+        if i == j or not (0 <= i < len(self._kp) and 0 <= j < len(self._kp)):
+            return
+        self.flush_pending_nudge()
+        self.save_state_for_undo('swap', {'i': i, 'j': j})
+        self._swap_keypoints(i, j)
+        
+    def _swap_keypoints(self, i: int, j: int):
+        """두 키포인트 교환 (최근 추가된 점 인덱스도 함께 따라감)"""
+        self._kp[[i, j]] = self._kp[[j, i]]
+        if self.last_added_point in (i, j):
+            self.last_added_point = j if self.last_added_point == i else i
+        self.update_keypoint_area(i, j)
+        
     def select_keypoint(self, index: int):
         """키포인트 선택"""
-        self.selected_point = index
-        self.update()
+        self.flush_pending_nudge()  # 이전 선택 포인트에 대한 이동 먼저 반영
+        previous, self.selected_point = self.selected_point, index
+        self.update_keypoint_area(previous, index)
         
     def set_show_labels(self, show: bool):
         """라벨 표시 설정"""
@@ -126,120 +383,256 @@ class ImageCanvas(QWidget):
         self.update()
         
     def set_window_level(self, level: int):
-        """DICOM Window Level 설정"""
+        """DICOM Window Level 설정 (표시는 preprocess_dicom 결과 그대로)"""
         if self.is_dicom:
             self.window_level = level
-            self.update_display()
             
     def set_window_width(self, width: int):
-        """DICOM Window Width 설정"""
+        """DICOM Window Width 설정 (표시는 preprocess_dicom 결과 그대로)"""
         if self.is_dicom:
             self.window_width = width
-            self.update_display()
             
     def set_dicom_preset(self, preset: str):
         """DICOM 프리셋 설정"""
         if not self.is_dicom:
             return
             
-        presets = {
-            'Soft Tissue': (40, 400),
-            'Bone': (300, 1500),
-            'Lung': (-600, 1600),
-            'General': (0, 255)
-        }
-        
-        if preset in presets:
-            level, width = presets[preset]
-            self.window_level = level
-            self.window_width = width
-            self.update_display()
+        if preset in self.DICOM_PRESETS:
+            self.window_level, self.window_width = self.DICOM_PRESETS[preset]
             
     def paintEvent(self, event):
         """그리기 이벤트"""
         if self.pixmap is None:
             return
             
+        # 이미지/글리프 pixmap 복사만 하므로 경로 안티앨리어싱은 켜지 않음 (글리프는 생성 시 적용됨)
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
         
-        # 배경 그리기
-        painter.fillRect(self.rect(), QColor(50, 50, 50))
+        # 배경 그리기 (다시 그릴 영역만, 이미지도 페인트 엔진이 이 영역으로 잘라서 그림)
+        dirty_rect = event.rect()
+        painter.fillRect(dirty_rect, self._background_color)
         
-        # 이미지 그리기
+        # 이미지 그리기 (캐시된 스케일 pixmap은 1:1 복사, 크게 확대한 경우는 그릴 때 페인트 엔진이 스케일링)
         if self.pixmap:
-            # 줌 적용된 이미지 크기 계산
-            base_size = self.size()
-            zoomed_size = QSize(
-                int(base_size.width() * self.zoom_factor),
-                int(base_size.height() * self.zoom_factor)
-            )
+            image_rect = self.get_image_rect()
+            scaled = self._get_scaled_pixmap(image_rect.width(), image_rect.height())
+            if scaled is not None:
+                painter.drawPixmap(image_rect.topLeft(), scaled)
+            else:
+                # 크게 확대한 경우: 다시 그릴 영역에 보이는 원본 부분만 잘라서 스케일링
+                # (원본 픽셀 경계에 맞추고 1픽셀 여유를 둬서 전체를 그릴 때와 같은 보간 결과가 나오게 함)
+                visible = image_rect.intersected(dirty_rect)
+                if not visible.isEmpty():
+                    scale_x, scale_y = self._screen_scale.tolist()
+                    left = max(0, int((visible.left() - image_rect.x()) / scale_x) - 1)
+                    top = max(0, int((visible.top() - image_rect.y()) / scale_y) - 1)
+                    right = min(self.pixmap.width(), int((visible.right() + 1 - image_rect.x()) / scale_x) + 2)
+                    bottom = min(self.pixmap.height(), int((visible.bottom() + 1 - image_rect.y()) / scale_y) + 2)
+                    source = QRect(left, top, right - left, bottom - top)
+                    target = QRectF(image_rect.x() + left * scale_x, image_rect.y() + top * scale_y,
+                                    source.width() * scale_x, source.height() * scale_y)
+                    painter.setRenderHint(QPainter.SmoothPixmapTransform, not self._interacting)
+                    painter.drawPixmap(target, self.pixmap, QRectF(source))
+            
+            # 키포인트 그리기
+            self.draw_keypoints(painter, dirty_rect)
             
-            # 이미지를 줌 크기에 맞춤
-            scaled_pixmap = self.pixmap.scaled(
-                zoomed_size,
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
+    def _get_scaled_pixmap(self, width: int, height: int) -> Optional[QPixmap]:
+        """화면 크기로 스케일링한 pixmap (pixmap/크기가 같으면 캐시 재사용, 창보다 훨씬 크면 None)"""
+        if width == self.pixmap.width() and height == self.pixmap.height():
+            return self.pixmap
+        # 크게 확대하면 캐시가 너무 커지므로 보이는 부분만 그릴 때 스케일링
+        if width * height > 4 * self.width() * self.height():
+            self._scaled_pixmap = self._scaled_key = None
+            return None
+        key = (self.pixmap.cacheKey(), width, height)
+        if key != self._scaled_key:
+            # 줌 중에는 단계마다 리샘플링하지 않고 빠른 스케일링으로 그림
+            if self._interacting:
+                return None
+            self._scaled_pixmap = self.pixmap.scaled(width, height, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+            self._scaled_key = key
+        return self._scaled_pixmap
+        
+    def _begin_interaction(self):
+        """줌/패닝 시작 (멈춘 뒤 120ms가 지나면 부드럽게 다시 그림)"""
+        self._interacting = True
+        self._smooth_timer.start()
+        
+    def _end_interaction(self):
+        """줌/패닝 종료 - 부드러운 스케일링으로 다시 그리기"""
+        self._interacting = False
+        self.update()
+        
+    def get_image_rect(self) -> QRect:
+        """현재 이미지의 화면상 위치와 크기 반환 (줌, 중앙 정렬, 패닝 적용)"""
+        if not self.pixmap:
+            return QRect()
+        return QRect(*self._get_image_geometry())
+        
+    def _get_image_geometry(self) -> Tuple[int, int, int, int]:
+        """이미지 영역 (x, y, w, h) - 창 크기/줌/패닝/이미지 크기가 같으면 캐시 재사용"""
+        key = (self.width(), self.height(), self.zoom_factor,
+               self.pan_offset.x(), self.pan_offset.y(), self.pixmap.width(), self.pixmap.height())
+        if key != self._geometry_key:
+            # 줌 적용된 이미지 크기 계산 (종횡비 유지)
+            zoomed_size = QSize(
+                int(self.width() * self.zoom_factor),
+                int(self.height() * self.zoom_factor)
             )
+            image_size = self.pixmap.size().scaled(zoomed_size, Qt.KeepAspectRatio)
             
             # 중앙 정렬 (패닝 오프셋 적용)
-            x = (self.width() - scaled_pixmap.width()) // 2 + self.pan_offset.x()
-            y = (self.height() - scaled_pixmap.height()) // 2 + self.pan_offset.y()
-            
-            painter.drawPixmap(x, y, scaled_pixmap)
-            
-            # 키포인트 그리기
-            self.draw_keypoints(painter, x, y, scaled_pixmap.size())
+            x = (self.width() - image_size.width()) // 2 + self.pan_offset.x()
+            y = (self.height() - image_size.height()) // 2 + self.pan_offset.y()
+            self._geometry = (x, y, image_size.width(), image_size.height())
+            self._geometry_key = key
+            self._screen_offset = np.array([x, y], dtype=np.int32)
+            self._screen_scale = np.array([image_size.width() / self.pixmap.width(),
+                                           image_size.height() / self.pixmap.height()])
+        return self._geometry
+        
+    def _image_to_screen(self, points: np.ndarray) -> np.ndarray:
+        """이미지 좌표 (N, 2) → 화면 좌표 (N, 2) int32 (draw_keypoints와 같은 변환)"""
+        self._get_image_geometry()
+        return (points * self._screen_scale).astype(np.int32) + self._screen_offset
+        
+    def draw_keypoints(self, painter: QPainter, clip_rect: Optional[QRect] = None):
+        """키포인트 그리기 (clip_rect 또는 위젯 영역에 걸치는 포인트만)"""
+        if not len(self._kp):
+            return
             
-    def draw_keypoints(self, painter: QPainter, offset_x: int, offset_y: int, image_size):
-        """키포인트 그리기"""
-        if not self.keypoints:
+        # 좌표 변환 (이미지 좌표 → 화면 좌표, 전체 포인트를 한 번에 계산)
+        screen = self._image_to_screen(self._kp)
+        
+        # 모양/라벨이 다시 그릴 영역(없으면 위젯 전체)에 걸치는 포인트만 선택 - 확대 시 화면 밖 포인트 제외
+        if clip_rect is None:
+            clip_rect = self.rect()
+        m = self.KEYPOINT_MARGIN
+        visible = ((screen[:, 0] >= clip_rect.left() - m.right()) &
+                   (screen[:, 0] <= clip_rect.right() + m.left()) &
+                   (screen[:, 1] >= clip_rect.top() - m.bottom()) &
+                   (screen[:, 1] <= clip_rect.bottom() + m.top()))
+        indices = np.flatnonzero(visible).tolist()
+        if not indices:
             return
+        screen = screen[indices]
+        
+        # 라벨 글꼴/펜은 루프 밖에서 한 번만 설정 (글리프 복사는 펜을 사용하지 않음)
+        show_labels = self.show_labels
+        if show_labels:
+            painter.setFont(self._label_font)
+            painter.setPen(self._label_pen)
+            labels = self._get_label_texts(len(self._kp))
             
-        # 좌표 변환 (이미지 좌표 → 화면 좌표)
-        scale_x = image_size.width() / self.pixmap.width()
-        scale_y = image_size.height() / self.pixmap.height()
+        # 원 + 십자선 모양은 미리 그려 둔 pixmap을 찍기만 함 (크기와 라벨 위치는 줌이 바뀔 때만 계산)
+        if self._glyph_key != self.zoom_factor:
+            # 줌 팩터에 따라 크기 조정 (최소/최대 제한)
+            zoom_radius = max(2, min(8, int(3 * self.zoom_factor)))
+            zoom_cross_size = max(4, min(12, int(6 * self.zoom_factor)))
+            normal_glyph, center = self._get_point_glyph(False, zoom_radius, zoom_cross_size)
+            selected_glyph, _ = self._get_point_glyph(True, zoom_radius, zoom_cross_size)
+            # 라벨은 포인트 중심에서 (+10, -10)이 기준선 시작점
+            self._glyphs = (normal_glyph, selected_glyph, center,
+                            center + 10, center - 10 - self._label_ascent)
+            self._glyph_key = self.zoom_factor
+        normal_glyph, selected_glyph, center, label_dx, label_dy = self._glyphs
         
-        for i, (x, y) in enumerate(self.keypoints):
-            # 화면 좌표로 변환
-            screen_x = int(x * scale_x) + offset_x
-            screen_y = int(y * scale_y) + offset_y
+        # 글리프 좌상단 좌표를 한 번에 계산해 파이썬 int 목록으로 변환 (점마다 NumPy 스칼라 변환 없음)
+        origins = (screen - center).tolist()
+        selected_point = self.selected_point
+        for i, (glyph_x, glyph_y) in zip(indices, origins):
+            glyph = selected_glyph if i == selected_point else normal_glyph
+            painter.drawPixmap(glyph_x, glyph_y, glyph)
             
-            # 색상 설정
-            if i == self.selected_point:
-                color = QColor(255, 255, 0)  # 노란색 (선택됨)
-                pen_width = 3
-            else:
-                color = QColor(255, 0, 0)  # 빨간색
-                pen_width = 2
+            # 라벨 그리기
+            if show_labels:
+                painter.drawStaticText(glyph_x + label_dx, glyph_y + label_dy, labels[i])
                 
-            # 포인트 그리기
-            painter.setPen(QPen(color, pen_width))
-            painter.setBrush(QBrush(color))
+    def _get_label_texts(self, count: int) -> List[QStaticText]:
+        """1부터 count까지의 번호 라벨 (한 번 만든 레이아웃은 프레임 간 재사용)"""
+        texts = self._label_texts
+        while len(texts) < count:
+            text = QStaticText(str(len(texts) + 1))
+            text.prepare(font=self._label_font)
+            texts.append(text)
+        return texts
+        
+    def _keypoint_dirty_rect(self, index: int) -> QRect:
+        """키포인트 하나(모양 + 라벨)가 차지하는 화면 영역"""
+        if not self.pixmap or not (0 <= index < len(self._kp)):
+            return QRect()
+        screen_x, screen_y = self._image_to_screen(self._kp[index]).tolist()
+        m = self.KEYPOINT_MARGIN
+        return QRect(screen_x - m.left(), screen_y - m.top(),
+                     m.left() + m.right() + 1, m.top() + m.bottom() + 1)
+        
+    def update_keypoint_area(self, *indices: int, extra: Optional[QRect] = None):
+        """지정한 키포인트 주변만 다시 그리기 (extra: 이전 위치 등 추가 영역)"""
+        rect = QRect() if extra is None else QRect(extra)
+        for index in indices:
+            rect = rect.united(self._keypoint_dirty_rect(index))
+        if not rect.isNull():
+            self.update(rect)
             
-            # 줌 레벨에 따른 크기 조정
-            base_radius = 3
-            base_cross_size = 6
+    def _request_frame(self, rect: Optional[QRect] = None, scroll: Optional[Tuple[int, int]] = None):
+        """다시 그릴 영역/패닝 이동을 모아 두고 마지막 반영 후 16ms가 지났을 때만 반영"""
+        if rect is not None:
+            self._pending_rect = self._pending_rect.united(rect)
+        if scroll is not None:
+            self._pending_scroll[0] += scroll[0]
+            self._pending_scroll[1] += scroll[1]
+        if self._frame_timer.isActive():
+            return
+        if self._frame_clock.elapsed() >= 16:
+            self.flush_pending_frame()
+        else:
+            self._frame_timer.start()
             
-            # 줌 팩터에 따라 크기 조정 (최소/최대 제한)
-            zoom_radius = max(2, min(8, int(base_radius * self.zoom_factor)))
-            zoom_cross_size = max(4, min(12, int(base_cross_size * self.zoom_factor)))
+    def flush_pending_frame(self):
+        """모아 둔 패닝 이동과 다시 그릴 영역 반영"""
+        self._frame_timer.stop()
+        dx, dy = self._pending_scroll
+        if dx or dy:
+            # 패닝 오프셋은 화면 이동과 함께 바꿔야 부분 다시 그리기와 어긋나지 않음
+            self._pending_scroll = [0, 0]
+            self.pan_offset.setX(self.pan_offset.x() + dx)
+            self.pan_offset.setY(self.pan_offset.y() + dy)
+            self.scroll(dx, dy)
+        if not self._pending_rect.isNull():
+            self.update(self._pending_rect)
+            self._pending_rect = QRect()
+        self._frame_clock.restart()
+        
+    def _get_point_glyph(self, selected: bool, radius: int, cross_size: int) -> Tuple[QPixmap, int]:
+        """포인트 모양 pixmap과 중심 좌표 반환 (QPixmapCache로 캔버스 간 공유)"""
+        pen = self._selected_pen if selected else self._point_pen
+        center = cross_size + pen.width()
+        key = f"keypoint_glyph_{int(selected)}_{radius}_{cross_size}"
+        
+        glyph = QPixmapCache.find(key)
+        if glyph is None:
+            glyph = QPixmap(center * 2 + 1, center * 2 + 1)
+            glyph.fill(Qt.transparent)
+            painter = QPainter(glyph)
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(pen)
+            painter.setBrush(self._selected_brush if selected else self._point_brush)
             
             # 원 그리기
-            painter.drawEllipse(screen_x - zoom_radius, screen_y - zoom_radius, zoom_radius * 2, zoom_radius * 2)
+            painter.drawEllipse(center - radius, center - radius, radius * 2, radius * 2)
             
             # 십자선 그리기
-            painter.drawLine(screen_x - zoom_cross_size, screen_y, screen_x + zoom_cross_size, screen_y)
-            painter.drawLine(screen_x, screen_y - zoom_cross_size, screen_x, screen_y + zoom_cross_size)
-            
-            # 라벨 그리기
-            if self.show_labels:
-                painter.setPen(QPen(QColor(255, 255, 255), 1))
-                painter.setFont(QFont("Arial", 10))
-                painter.drawText(screen_x + 10, screen_y - 10, str(i+1))
-                
+            painter.drawLine(center - cross_size, center, center + cross_size, center)
+            painter.drawLine(center, center - cross_size, center, center + cross_size)
+            painter.end()
+            QPixmapCache.insert(key, glyph)
+        return glyph, center
+        
     def mousePressEvent(self, event: QMouseEvent):
         """마우스 클릭 이벤트"""
+        self.flush_pending_nudge()
+        self.flush_pending_frame()
         if event.button() == Qt.LeftButton:
             if event.modifiers() & Qt.AltModifier:
                 # Alt + 좌클릭: 패닝 모드
@@ -248,26 +641,15 @@ class ImageCanvas(QWidget):
                 # 일반 좌클릭: 포인트 선택/추가
                 self.mouse_mode = 'select'
                 
-                # 먼저 포인트 클릭 처리 (선택 또는 추가)
-                self.handle_point_click(event.pos())
+                # 먼저 포인트 클릭 처리 (선택 또는 추가, 이미지 밖이면 None)
+                image_pos = self.handle_point_click(event.pos())
                 
-                # 드래그 시작 위치 저장 (기존 점을 선택한 경우)
-                image_pos = self.screen_to_image_coords(event.pos())
+                # 클릭 결과 선택된 점(반경 안의 기존 점 또는 방금 추가한 점)은 항상 클릭 위치 근처이므로
+                # 거리를 다시 계산하지 않고 바로 드래그 시작
                 if image_pos and self.selected_point >= 0:
-                    # 선택된 점이 있고, 그 점 근처를 클릭한 경우
-                    x, y = self.keypoints[self.selected_point]
-                    distance = ((x - image_pos[0]) ** 2 + (y - image_pos[1]) ** 2) ** 0.5
-                    base_min_distance = 20
-                    min_distance = max(10, int(base_min_distance / self.zoom_factor))
-                    
-                    if distance < min_distance:
-                        # 드래그 시작 - 현재 위치 저장
-                        self.drag_start_position = [x, y]
-                        self.dragging = True
-                        print(f"드래그 시작: 점 {self.selected_point}, 위치: {self.drag_start_position}")
-                    else:
-                        self.drag_start_position = None
-                        self.dragging = False
+                    self.drag_start_position = self._kp[self.selected_point].tolist()
+                    self.dragging = True
+                    logger.debug("드래그 시작: 점 %d, 위치: %s", self.selected_point, self.drag_start_position)
                 else:
                     self.drag_start_position = None
                     self.dragging = False
@@ -287,22 +669,25 @@ class ImageCanvas(QWidget):
                 # 이미지 패닝
                 delta_x = event.pos().x() - self.last_mouse_pos.x()
                 delta_y = event.pos().y() - self.last_mouse_pos.y()
-                self.pan_offset.setX(self.pan_offset.x() + delta_x)
-                self.pan_offset.setY(self.pan_offset.y() + delta_y)
-                self.update()
+                self._begin_interaction()
+                # 그려진 화면을 옮기고 새로 드러난 부분만 다시 그림 (프레임당 한 번으로 모아서)
+                self._request_frame(scroll=(delta_x, delta_y))
             
         self.last_mouse_pos = event.pos()
         
     def mouseReleaseEvent(self, event: QMouseEvent):
         """마우스 릴리즈 이벤트"""
+        self.flush_pending_frame()
+        self.flush_pending_moves()
         if self.dragging and self.selected_point >= 0 and self.drag_start_position:
             # 드래그가 끝났을 때 실제로 이동했는지 확인
-            current_position = self.keypoints[self.selected_point]
+            current_position = self._kp[self.selected_point].tolist()
             # 실제로 위치가 변경된 경우만 저장 (좌표별 비교)
             if (self.drag_start_position[0] != current_position[0] or 
                 self.drag_start_position[1] != current_position[1]):
                 
-                print(f"드래그 상태 저장: 점 {self.selected_point}, 시작: {self.drag_start_position}, 끝: {current_position}")
+                logger.debug("드래그 상태 저장: 점 %d, 시작: %s, 끝: %s",
+                             self.selected_point, self.drag_start_position, current_position)
                 self.save_state_for_undo('move', {
                     'index': self.selected_point,
                     'old_position': self.drag_start_position.copy(),
@@ -315,6 +700,7 @@ class ImageCanvas(QWidget):
         
     def wheelEvent(self, event: QWheelEvent):
         """마우스 휠 이벤트 (줌)"""
+        self.flush_pending_frame()  # 보류 중인 패닝을 먼저 반영해야 포인터 중심 계산이 맞음
         if event.modifiers() & Qt.ControlModifier:
             # Ctrl+휠: 마우스 포인터 중심 줌
             delta = event.angleDelta().y()
@@ -332,6 +718,7 @@ class ImageCanvas(QWidget):
             
             # 마우스 포인터 위치를 중심으로 패닝 조정
             if self.zoom_factor != old_zoom:
+                self._begin_interaction()
                 # 마우스 포인터가 이미지 내부에 있는지 확인
                 image_rect = self.get_image_rect()
                 if image_rect.contains(mouse_pos):
@@ -350,86 +737,70 @@ class ImageCanvas(QWidget):
             
     def keyPressEvent(self, event: QKeyEvent):
         """키보드 이벤트"""
-        # 실행 취소 (Ctrl+Z)
-        if event.modifiers() & Qt.ControlModifier and event.key() == Qt.Key_Z:
-            self.undo()
-            return
-            
-        # 줌 단축키 처리
-        if event.modifiers() & Qt.ControlModifier:
-            key = event.key()
-            if key in [Qt.Key_Plus, Qt.Key_Equal, 43, 61]:  # + 키 (Shift+= 또는 +)
-                self.zoom_in()
-                return
-            elif key in [Qt.Key_Minus, 45]:  # - 키
-                self.zoom_out()
-                return
-            elif key == Qt.Key_0:
-                self.reset_view()
+        self.flush_pending_frame()
+        key = event.key()
+        modifiers = event.modifiers()
+        
+        # Ctrl 단축키 (실행 취소, 줌) - 표에서 한 번에 조회
+        if modifiers & Qt.ControlModifier:
+            action = self._ctrl_shortcuts.get(key)
+            if action is not None:
+                action()
                 return
         
         # 패닝 단축키 (Space + 방향키)
-        if event.key() == Qt.Key_Space:
+        if key == Qt.Key_Space:
             self.mouse_mode = 'pan'
             return
             
-        # 패닝 모드에서 방향키로 이미지 이동
-        if self.mouse_mode == 'pan':
-            pan_step = 20 if event.modifiers() & Qt.ShiftModifier else 10
-            if event.key() == Qt.Key_Left:
-                self.pan_offset.setX(self.pan_offset.x() + pan_step)
-                self.update()
-                return
-            elif event.key() == Qt.Key_Right:
-                self.pan_offset.setX(self.pan_offset.x() - pan_step)
-                self.update()
-                return
-            elif event.key() == Qt.Key_Up:
-                self.pan_offset.setY(self.pan_offset.y() + pan_step)
-                self.update()
-                return
-            elif event.key() == Qt.Key_Down:
-                self.pan_offset.setY(self.pan_offset.y() - pan_step)
-                self.update()
-                return
+        direction = self.ARROW_DIRECTIONS.get(key)
+        
+        # 패닝 모드에서 방향키로 이미지 이동 (이미지는 방향키 반대쪽으로 이동)
+        if self.mouse_mode == 'pan' and direction is not None:
+            pan_step = 20 if modifiers & Qt.ShiftModifier else 10
+            dx, dy = -direction[0] * pan_step, -direction[1] * pan_step
+            self._begin_interaction()
+            self.pan_offset += QPoint(dx, dy)
+            self.scroll(dx, dy)
+            return
         
         # 포인트 이동 단축키
         if self.selected_point >= 0:
-            step = 10 if event.modifiers() & Qt.ShiftModifier else 1
-            
-            if event.key() == Qt.Key_Left:
-                self.move_selected_point(-step, 0)
-            elif event.key() == Qt.Key_Right:
-                self.move_selected_point(step, 0)
-            elif event.key() == Qt.Key_Up:
-                self.move_selected_point(0, -step)
-            elif event.key() == Qt.Key_Down:
-                self.move_selected_point(0, step)
-            elif event.key() == Qt.Key_Delete:
+            if direction is not None:
+                step = 10 if modifiers & Qt.ShiftModifier else 1
+                self.queue_nudge(direction[0] * step, direction[1] * step)
+            elif key == Qt.Key_Delete:
+                self.flush_pending_nudge()
                 self.delete_selected_point()
+            else:
+                return
+            event.accept()
                 
     def keyReleaseEvent(self, event: QKeyEvent):
         """키보드 릴리즈 이벤트"""
         if event.key() == Qt.Key_Space:
             self.mouse_mode = 'select'
                 
-    def handle_point_click(self, pos: QPoint):
-        """포인트 클릭 처리"""
+    def handle_point_click(self, pos: QPoint) -> Optional[Tuple[int, int]]:
+        """포인트 클릭 처리 (클릭한 이미지 좌표 반환, 이미지 밖이면 None)"""
         # 화면 좌표를 이미지 좌표로 변환
         image_pos = self.screen_to_image_coords(pos)
         if image_pos is None:
-            return
+            return None
             
         # 기존 포인트와의 거리 확인 (줌 레벨에 따라 조정)
         base_min_distance = 20
         min_distance = max(10, int(base_min_distance / self.zoom_factor))
         closest_point = -1
+        previous = self.selected_point
         
-        for i, (x, y) in enumerate(self.keypoints):
-            distance = ((x - image_pos[0]) ** 2 + (y - image_pos[1]) ** 2) ** 0.5
-            if distance < min_distance:
-                min_distance = distance
-                closest_point = i
+        # 가장 가까운 포인트 (제곱 거리로 비교, 파이썬 루프/제곱근 없이 한 번에 계산)
+        if len(self._kp):
+            diffs = self._kp.astype(np.int64) - image_pos
+            dist_sq = np.einsum('ij,ij->i', diffs, diffs)
+            index = int(dist_sq.argmin())
+            if dist_sq[index] < min_distance * min_distance:
+                closest_point = index
                 
         if closest_point >= 0:
             # 기존 포인트 선택
@@ -437,23 +808,25 @@ class ImageCanvas(QWidget):
             self.point_selected.emit(closest_point)
         else:
             # 새 포인트 추가 전에 상태 저장
-            self.save_state_for_undo('add', {'position': image_pos})
-            self.keypoints.append([image_pos[0], image_pos[1]])
-            self.selected_point = len(self.keypoints) - 1
+            self.save_state_for_undo('add', {'index': len(self._kp), 'position': image_pos})
+            self._append_keypoint(*image_pos)
+            self.selected_point = len(self._kp) - 1
             self.last_added_point = self.selected_point
             self.point_added.emit(self.selected_point, image_pos[0], image_pos[1])
             
-        self.update()
+        # 이전/새 선택 포인트 주변만 다시 그림
+        self.update_keypoint_area(previous, self.selected_point)
+        return image_pos
         
     def handle_right_click(self, pos: QPoint):
         """우클릭 처리 - 최근 추가된 점 삭제"""
-        if self.last_added_point >= 0 and self.last_added_point < len(self.keypoints):
+        if self.last_added_point >= 0 and self.last_added_point < len(self._kp):
             # 삭제 전에 상태 저장
-            deleted_point = self.keypoints[self.last_added_point]
+            deleted_point = self._kp[self.last_added_point].tolist()
             self.save_state_for_undo('delete', {'index': self.last_added_point, 'point': deleted_point})
             
             # 최근 추가된 점 삭제
-            del self.keypoints[self.last_added_point]
+            self._remove_keypoint(self.last_added_point)
             
             # 선택 상태 업데이트
             if self.selected_point == self.last_added_point:
@@ -478,42 +851,77 @@ class ImageCanvas(QWidget):
             return
             
         # 좌표 범위 제한
-        if self.pixmap:
-            x = max(0, min(self.pixmap.width() - 1, image_pos[0]))
-            y = max(0, min(self.pixmap.height() - 1, image_pos[1]))
-        else:
-            x, y = image_pos
+        x, y = image_pos
+        x = 0 if x < 0 else (self._clip_w if x > self._clip_w else x)
+        y = 0 if y < 0 else (self._clip_h if y > self._clip_h else y)
             
         # 포인트 이동 (상태 저장은 이미 mousePressEvent에서 했으므로 여기서는 하지 않음)
-        self.keypoints[self.selected_point] = [x, y]
-        self.point_moved.emit(self.selected_point, x, y)
-        self.update()
+        old_rect = self._keypoint_dirty_rect(self.selected_point)
+        self._kp[self.selected_point] = (x, y)
+        self._pending_moves[self.selected_point] = (x, y)
+        if not self._move_timer.isActive():
+            self._move_timer.start()
+        self._request_frame(old_rect.united(self._keypoint_dirty_rect(self.selected_point)))
         
-    def move_selected_point(self, dx: int, dy: int):
-        """선택된 포인트 이동"""
-        if self.selected_point < 0 or self.selected_point >= len(self.keypoints):
+    def flush_pending_moves(self):
+        """보류 중인 드래그 이동을 한 번에 전달"""
+        self._move_timer.stop()
+        if self._pending_moves:
+            changes = self._pending_moves
+            self._pending_moves = {}
+            self.points_moved.emit(changes)
+        
+    def queue_nudge(self, dx: int, dy: int):
+        """방향키 이동 (키마다 경계 제한/실행 취소 기록, 다시 그리기와 시그널은 flush_pending_nudge에서 한 번에)"""
+        if self.selected_point < 0 or self.selected_point >= len(self._kp):
             return
+        old_rect = self._keypoint_dirty_rect(self.selected_point)
+        new_x, new_y = self._apply_move(self.selected_point, dx, dy)
+        self._nudge_rect = self._nudge_rect.united(old_rect)
+        self._pending_nudge[self.selected_point] = (new_x, new_y)
+        if not self._nudge_timer.isActive():
+            self._nudge_timer.start()
+            
+    def flush_pending_nudge(self):
+        """방향키로 옮긴 포인트의 다시 그리기/이동 시그널 반영"""
+        self._nudge_timer.stop()
+        pending, self._pending_nudge = self._pending_nudge, {}
+        rect, self._nudge_rect = self._nudge_rect, QRect()
+        for index, (x, y) in pending.items():
+            self.point_moved.emit(index, x, y)
+        if pending:
+            self.update_keypoint_area(*pending, extra=rect)
             
-        x, y = self.keypoints[self.selected_point]
-        new_x = max(0, min(self.pixmap.width() - 1 if self.pixmap else 9999, x + dx))
-        new_y = max(0, min(self.pixmap.height() - 1 if self.pixmap else 9999, y + dy))
+    def _apply_move(self, index: int, dx: int, dy: int) -> Tuple[int, int]:
+        """포인트를 이미지 범위 안으로 제한해 이동하고 실행 취소 상태 저장"""
+        x, y = self._kp[index].tolist()
+        new_x, new_y = x + dx, y + dy
+        new_x = 0 if new_x < 0 else (self._clip_w if new_x > self._clip_w else new_x)
+        new_y = 0 if new_y < 0 else (self._clip_h if new_y > self._clip_h else new_y)
         
         # 실행 취소를 위한 상태 저장 (이동 전 위치만 저장)
-        old_position = self.keypoints[self.selected_point].copy()
-        self.save_state_for_undo('move', {'index': self.selected_point, 'old_position': old_position, 'new_position': [new_x, new_y]})
+        self.save_state_for_undo('move', {'index': index, 'old_position': [x, y], 'new_position': [new_x, new_y]})
+        self._kp[index] = (new_x, new_y)
+        return new_x, new_y
         
-        self.keypoints[self.selected_point] = [new_x, new_y]
+    def move_selected_point(self, dx: int, dy: int):
+        """선택된 포인트 이동"""
+        if self.selected_point < 0 or self.selected_point >= len(self._kp):
+            return
+            
+        old_rect = self._keypoint_dirty_rect(self.selected_point)
+        new_x, new_y = self._apply_move(self.selected_point, dx, dy)
         self.point_moved.emit(self.selected_point, new_x, new_y)
-        self.update()
+        self.update_keypoint_area(self.selected_point, extra=old_rect)
         
     def delete_selected_point(self):
         """선택된 포인트 삭제"""
-        if self.selected_point >= 0 and self.selected_point < len(self.keypoints):
+        if self.selected_point >= 0 and self.selected_point < len(self._kp):
             # 실행 취소를 위한 상태 저장
-            deleted_point = self.keypoints[self.selected_point]
+            deleted_point = self._kp[self.selected_point].tolist()
             self.save_state_for_undo('delete', {'index': self.selected_point, 'point': deleted_point})
             
-            del self.keypoints[self.selected_point]
+            self._remove_keypoint(self.selected_point)
             self.selected_point = -1
             self.update()
             
@@ -522,31 +930,18 @@ class ImageCanvas(QWidget):
         if not self.pixmap:
             return None
             
-        # 줌 적용된 이미지 크기 계산
-        base_size = self.size()
-        zoomed_size = QSize(
-            int(base_size.width() * self.zoom_factor),
-            int(base_size.height() * self.zoom_factor)
-        )
-        
-        # 이미지를 줌 크기에 맞춤
-        scaled_pixmap = self.pixmap.scaled(
-            zoomed_size,
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation
-        )
-        
         # 이미지 영역 계산 (패닝 오프셋 포함)
-        image_x = (self.width() - scaled_pixmap.width()) // 2 + self.pan_offset.x()
-        image_y = (self.height() - scaled_pixmap.height()) // 2 + self.pan_offset.y()
+        image_x, image_y, image_w, image_h = self._get_image_geometry()
+        pos_x, pos_y = screen_pos.x(), screen_pos.y()
         
         # 이미지 영역 내인지 확인
-        if (image_x <= screen_pos.x() <= image_x + scaled_pixmap.width() and
-            image_y <= screen_pos.y() <= image_y + scaled_pixmap.height()):
+        if (image_x <= pos_x <= image_x + image_w and
+            image_y <= pos_y <= image_y + image_h and image_w > 0 and image_h > 0):
             
-            # 상대 좌표 계산
-            rel_x = (screen_pos.x() - image_x) / scaled_pixmap.width() * self.pixmap.width()
-            rel_y = (screen_pos.y() - image_y) / scaled_pixmap.height() * self.pixmap.height()
+            # 상대 좌표 계산 (그리기와 같은 scale의 역변환)
+            scale_x, scale_y = self._screen_scale.tolist()
+            rel_x = (pos_x - image_x) / scale_x
+            rel_y = (pos_y - image_y) / scale_y
             
             return (int(rel_x), int(rel_y))
             
@@ -563,6 +958,7 @@ class ImageCanvas(QWidget):
         """확대"""
         self.zoom_factor *= 1.2
         self.zoom_factor = min(10.0, self.zoom_factor)
+        self._begin_interaction()
         self.update()
         self.zoom_changed.emit(self.get_zoom_percentage())
         
@@ -570,96 +966,72 @@ class ImageCanvas(QWidget):
         """축소"""
         self.zoom_factor /= 1.2
         self.zoom_factor = max(0.1, self.zoom_factor)
+        self._begin_interaction()
         self.update()
         self.zoom_changed.emit(self.get_zoom_percentage())
         
-    def get_image_rect(self) -> QRect:
-        """현재 이미지의 화면상 위치와 크기 반환"""
-        if not self.pixmap:
-            return QRect()
-            
-        # 줌 적용된 이미지 크기 계산
-        base_size = self.size()
-        zoomed_size = QSize(
-            int(base_size.width() * self.zoom_factor),
-            int(base_size.height() * self.zoom_factor)
-        )
-        
-        # 이미지를 줌 크기에 맞춤
-        scaled_pixmap = self.pixmap.scaled(
-            zoomed_size,
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation
-        )
-        
-        # 이미지 위치 계산
-        x = (self.width() - scaled_pixmap.width()) // 2 + self.pan_offset.x()
-        y = (self.height() - scaled_pixmap.height()) // 2 + self.pan_offset.y()
-        
-        return QRect(x, y, scaled_pixmap.width(), scaled_pixmap.height())
-        
     def get_zoom_percentage(self) -> int:
         """현재 줌 레벨을 퍼센트로 반환"""
         return int(self.zoom_factor * 100)
         
     def reset_view(self):
         """뷰 리셋"""
+        self._pending_scroll = [0, 0]  # 보류 중인 패닝은 버림
         self.zoom_factor = 1.0
         self.pan_offset = QPoint(0, 0)
         if self.is_dicom:
             self.window_level = self.dicom_loader.get_default_window_level()
             self.window_width = self.dicom_loader.get_default_window_width()
-            self.update_display()
-        else:
-            self.update()
+        self.update()
         self.zoom_changed.emit(self.get_zoom_percentage())
         
 
     def save_state_for_undo(self, action_type: str, data=None):
         """실행 취소를 위한 상태 저장"""
-        # 모든 작업에 대해 전체 상태 저장
-        state = {
-            'action_type': action_type,
-            'keypoints_before': [kp.copy() for kp in self.keypoints],  # 깊은 복사
-            'selected_point_before': self.selected_point,
-            'data': data
-        }
+        # 키포인트 전체를 복사하지 않고 되돌리는 데 필요한 변경분(data)만 저장
+        state = {'action_type': action_type, 'data': data}
         
         self.undo_stack.append(state)
-        
-        # 최대 단계 제한
-        if len(self.undo_stack) > self.max_undo_steps:
-            self.undo_stack.pop(0)
             
     def undo(self):
         """실행 취소"""
+        self.flush_pending_nudge()  # 보류 중인 방향키 이동 시그널을 먼저 보낸 뒤 취소
         if not self.undo_stack:
-            print("실행 취소할 작업이 없습니다")
+            logger.debug("실행 취소할 작업이 없습니다")
             return
         
         # 이전 상태 복원
         previous_state = self.undo_stack.pop()
-        print(f"실행 취소: {previous_state['action_type']}, 스택 크기: {len(self.undo_stack)}")
+        logger.debug("실행 취소: %s, 스택 크기: %d", previous_state['action_type'], len(self.undo_stack))
         
-        if previous_state['action_type'] == 'move':
+        action_type = previous_state['action_type']
+        data = previous_state['data'] or {}
+        index = data.get('index', -1)
+        if action_type == 'move':
             # 이동 취소: 해당 점의 위치만 복원
-            data = previous_state['data']
-            if data and 'index' in data and 'old_position' in data:
-                index = data['index']
-                old_position = data['old_position']
-                if 0 <= index < len(self.keypoints):
-                    self.keypoints[index] = old_position.copy()
-                    self.selected_point = index
-                    print(f"이동 취소: 점 {index}를 {old_position}로 복원")
-        else:
-            # 추가/삭제 취소: 전체 상태 복원
-            self.keypoints = [kp.copy() for kp in previous_state['keypoints_before']]
-            self.selected_point = previous_state['selected_point_before']
-            
-            # last_added_point 업데이트
-            if previous_state['action_type'] == 'add':
+            if 0 <= index < len(self._kp) and 'old_position' in data:
+                self._kp[index] = data['old_position']
+                self.selected_point = index
+                logger.debug("이동 취소: 점 %d를 %s로 복원", index, data['old_position'])
+        elif action_type == 'add':
+            # 추가 취소: 추가된 점 삭제
+            if 0 <= index < len(self._kp):
+                self._remove_keypoint(index)
+                self.selected_point = -1
                 self.last_added_point = -1
-            print(f"전체 상태 복원: {len(self.keypoints)}개 점")
+                logger.debug("추가 취소: 점 %d 삭제", index)
+        elif action_type == 'swap':
+            # 교환 취소: 두 점을 다시 교환
+            i, j = data.get('i', -1), data.get('j', -1)
+            if 0 <= i < len(self._kp) and 0 <= j < len(self._kp):
+                self._swap_keypoints(i, j)
+                logger.debug("교환 취소: 점 %d, %d", i, j)
+        elif action_type == 'delete':
+            # 삭제 취소: 삭제된 점을 원래 위치에 다시 삽입
+            if 0 <= index <= len(self._kp) and 'point' in data:
+                self._insert_keypoint(index, *data['point'])
+                self.selected_point = index
+                logger.debug("삭제 취소: 점 %d를 %s에 복원", index, data['point'])
         
         # UI 업데이트
         self.update()
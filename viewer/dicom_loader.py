@@ -3,11 +3,28 @@ DICOM Loader for Keypoint Labeler
 DICOM 파일 로딩 및 처리
 """
 
+import os
+import threading
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple, Optional
-import pydicom
-from pydicom.dataset import FileDataset
-import cv2
+
+# pydicom, cv2는 가져오는 데 시간이 오래 걸리므로 DICOM 파일을 처음 열 때 로드
+
+# RGB 채널별 CLAHE용 스레드 풀 (프로세스마다 처음 사용할 때 한 번만 생성)
+_channel_pool = None
+_channel_pool_pid = None
+_channel_pool_lock = threading.Lock()
+
+
+def _get_channel_pool() -> ThreadPoolExecutor:
+    """현재 프로세스의 채널 처리 스레드 풀 반환 (다른 프로세스에서 물려받은 풀은 쓰지 않음)"""
+    global _channel_pool, _channel_pool_pid
+    with _channel_pool_lock:
+        if _channel_pool is None or _channel_pool_pid != os.getpid():
+            _channel_pool = ThreadPoolExecutor(max_workers=3)
+            _channel_pool_pid = os.getpid()
+        return _channel_pool
 
 
 class DICOMLoader:
@@ -20,8 +37,37 @@ class DICOMLoader:
         self.pixel_array = None
         self.original_pixel_array = None
         
-        self.load_dicom()
+        # Window/Level 계산용 버퍼 (드래그 중 반복 호출 시 재할당 방지)
+        self._wl_tmp = None
+        self._wl_out = None
+        self._wl_lut = None  # 정수 픽셀용 룩업 테이블 (원본 비트 패턴 → 0-255)
+        self._wl_lut_key = None
+        self._wl_idx = None  # 32비트 정수 픽셀의 LUT 인덱스 (픽셀 - 최솟값)
+        self._wl_range = None  # (원본 배열, 최솟값, 최댓값) - 원본은 바뀌지 않으므로 한 번만 계산
+        self._hist_range = None  # (원본 배열, (최솟값, 최댓값)) - 히스토그램 구간 범위
+        self._processed = None  # preprocess_dicom 결과 (dataset에만 의존하므로 한 번만 계산)
+        self._meta_cache = {}  # 태그/원본에서 구한 기본 W/L, 메타데이터 (로드 후 바뀌지 않음)
         
+        self.load_dicom()
+
+    def __getstate__(self):
+        """프로세스 간 전달용 상태 (원본 배열 사본, 디코딩 캐시, W/L 버퍼 제외)"""
+        state = self.__dict__.copy()
+        state['pixel_array'] = None
+        state['_wl_tmp'] = state['_wl_out'] = state['_wl_lut'] = state['_wl_lut_key'] = None
+        state['_wl_idx'] = state['_wl_range'] = state['_hist_range'] = None
+        # pydicom이 캐시한 pixel_array는 PixelData에서 다시 디코딩 가능
+        if self.dataset is not None and getattr(self.dataset, '_pixel_array', None) is not None:
+            self.dataset._pixel_array = None
+            self.dataset._pixel_id = {}
+        return state
+
+    def __setstate__(self, state):
+        """전달받은 상태 복원"""
+        self.__dict__.update(state)
+        # 편집 함수는 배열을 새로 만들어 대입하므로 원본과 공유해도 안전
+        self.pixel_array = self.original_pixel_array
+
     @staticmethod
     def _lutdata_to_array(raw_lut):
         """
@@ -54,7 +100,8 @@ class DICOMLoader:
         """리스트나 MultiValue에서 첫 번째 값을 안전하게 가져오는 함수"""
         if value is None:
             return default
-        if isinstance(value, (list, pydicom.multival.MultiValue)):
+        from pydicom.multival import MultiValue
+        if isinstance(value, (list, MultiValue)):
             if len(value) > 0:
                 return value[0]
             else:
@@ -66,7 +113,9 @@ class DICOMLoader:
         """
         DICOM 파일을 보기 좋게 시각화하는 함수 (MONOCHROME + RGB 모두 대응)
         """
+        import cv2
         pixel_array = ds.pixel_array
+        owned_float = False  # pixel_array가 여기서 새로 만든 float64 배열인지 (제자리 연산 가능 여부)
 
         # 1) signed pixel 처리 (PixelRepresentation == 1)
         try:
@@ -89,8 +138,8 @@ class DICOMLoader:
                 voi_lut = ds.VOILUTSequence[0]
                 raw_bytes = voi_lut.LUTData               # b'\xc0\x00\xc0\x00...'
                 lut_data = DICOMLoader._lutdata_to_array(raw_bytes)
-                pixel_array = np.clip(pixel_array, 0, len(lut_data)-1)
-                pixel_array = lut_data[pixel_array]
+                # 범위를 벗어난 인덱스는 양 끝으로 (np.clip 후 인덱싱과 같은 결과를 임시 배열 없이 한 번에)
+                pixel_array = np.take(lut_data, pixel_array, mode='clip')
             
             # Rescale 처리 (개선된 None 처리)
             try:
@@ -101,7 +150,10 @@ class DICOMLoader:
                     slope = DICOMLoader._safe_float(rescale_slope, 1.0)
                     intercept = DICOMLoader._safe_float(rescale_intercept, 0.0)
                     print(f"Rescale 적용: slope={slope}, intercept={intercept}")
-                    pixel_array = pixel_array * slope + intercept
+                    # 새 float64 배열을 한 번만 만들고 이후 연산은 그 배열에 제자리로 수행
+                    pixel_array = np.multiply(pixel_array, slope, dtype=np.float64)
+                    pixel_array += intercept
+                    owned_float = True
                 else:
                     print("Rescale 값이 없어서 Window/Level 처리로 넘어갑니다.")
             except Exception as e:
@@ -118,7 +170,10 @@ class DICOMLoader:
                     
                     if wc is not None and ww is not None:
                         print(f"Window/Level 적용: center={wc}, width={ww}")
-                        pixel_array = np.clip(pixel_array, wc - ww / 2, wc + ww / 2)
+                        if owned_float:
+                            np.clip(pixel_array, wc - ww / 2, wc + ww / 2, out=pixel_array)
+                        else:
+                            pixel_array = np.clip(pixel_array, wc - ww / 2, wc + ww / 2)
                     else:
                         print("Window/Level 값이 유효하지 않습니다.")
                 else:
@@ -126,10 +181,16 @@ class DICOMLoader:
             except Exception as e:
                 print(f"Window/Level 처리 중 오류: {e}")
             
-            # Normalize
-            if np.max(pixel_array) != np.min(pixel_array):
-                pixel_array = ((pixel_array - np.min(pixel_array)) * 255 / 
-                              (np.max(pixel_array) - np.min(pixel_array)))
+            # Normalize (최솟값/최댓값은 한 번씩만 계산)
+            min_val, max_val = np.min(pixel_array), np.max(pixel_array)
+            if max_val != min_val:
+                if owned_float:
+                    # 위에서 만든 float64 배열이면 임시 배열 없이 같은 순서로 제자리 연산
+                    pixel_array -= min_val
+                    pixel_array *= 255
+                    pixel_array /= (max_val - min_val)
+                else:
+                    pixel_array = (pixel_array - min_val) * 255 / (max_val - min_val)
 
             pixel_array = pixel_array.astype(np.uint8)
 
@@ -155,11 +216,12 @@ class DICOMLoader:
 
             # CLAHE 채널별 적용
             try:
-                enhanced_channels = []
-                clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-                for c in range(3):
-                    enhanced = clahe.apply(pixel_array[:, :, c])
-                    enhanced_channels.append(enhanced)
+                # CLAHE 객체는 내부 버퍼를 쓰므로 채널마다 따로 만들고, 채널은 연속 배열로 넘김
+                def apply_clahe(channel):
+                    return cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(channel)
+                channels = [np.ascontiguousarray(pixel_array[:, :, c]) for c in range(3)]
+                # OpenCV 연산은 GIL을 놓으므로 세 채널을 동시에 처리
+                enhanced_channels = list(_get_channel_pool().map(apply_clahe, channels))
                 pixel_array = np.stack(enhanced_channels, axis=-1)
             except:
                 pass
@@ -173,11 +235,15 @@ class DICOMLoader:
         
     def load_dicom(self):
         """DICOM 파일 로드"""
+        import pydicom
+        self._processed = None
+        self._meta_cache = {}
         try:
             # 먼저 기본 방법으로 시도
             self.dataset = pydicom.dcmread(self.file_path)
-            self.original_pixel_array = self.dataset.pixel_array.copy()
-            self.pixel_array = self.original_pixel_array.copy()
+            # 디코딩한 배열을 복사하지 않고 공유 (전처리는 읽기만 하고, 편집 함수는 공유 시 새 배열을 만듦)
+            self.original_pixel_array = self.dataset.pixel_array
+            self.pixel_array = self.original_pixel_array
         except Exception as e:
             error_msg = str(e)
             if "unable to decompress" in error_msg.lower() and "jpeg" in error_msg.lower():
@@ -187,8 +253,8 @@ class DICOMLoader:
                     self.dataset = pydicom.dcmread(self.file_path, force=True)
                     # pixel_array 접근 시 에러가 발생할 수 있으므로 try-except로 감싸기
                     try:
-                        self.original_pixel_array = self.dataset.pixel_array.copy()
-                        self.pixel_array = self.original_pixel_array.copy()
+                        self.original_pixel_array = self.dataset.pixel_array
+                        self.pixel_array = self.original_pixel_array
                     except Exception as pixel_error:
                         # pixel_array 접근 실패 시 더 자세한 안내 메시지 제공
                         raise Exception(f"DICOM 파일 로드 실패: {error_msg}\n\n"
@@ -217,23 +283,31 @@ class DICOMLoader:
                 raise Exception(f"DICOM 파일 로드 실패: {error_msg}")
             
     def get_image(self) -> np.ndarray:
-        """처리된 이미지 반환"""
-        return self.preprocess_dicom(self.dataset)
+        """처리된 이미지 반환 (처음 호출할 때만 전처리)"""
+        if self._processed is None:
+            self._processed = self.preprocess_dicom(self.dataset)
+        return self._processed
         
     def get_original_image(self) -> np.ndarray:
         """원본 이미지 반환"""
         return self.original_pixel_array
         
     def get_default_window_level(self) -> int:
-        """기본 Window Level 반환"""
+        """기본 Window Level 반환 (파일당 한 번만 계산)"""
+        cached = self._meta_cache.get('window_level')
+        if cached is None:
+            cached = self._meta_cache['window_level'] = self._compute_default_window_level()
+        return cached
+        
+    def _compute_default_window_level(self) -> int:
+        """기본 Window Level 계산 (태그가 없으면 원본 전체를 훑음)"""
         try:
-            # DICOM 태그에서 Window Center 가져오기
-            if hasattr(self.dataset, 'WindowCenter'):
-                window_center = getattr(self.dataset, 'WindowCenter', None)
-                if window_center is not None:
-                    first_value = DICOMLoader._safe_get_first_value(window_center)
-                    if first_value is not None:
-                        return int(DICOMLoader._safe_float(first_value, 128.0))
+            # DICOM 태그에서 Window Center 가져오기 (getattr 한 번으로 존재 확인과 조회)
+            window_center = getattr(self.dataset, 'WindowCenter', None)
+            if window_center is not None:
+                first_value = DICOMLoader._safe_get_first_value(window_center)
+                if first_value is not None:
+                    return int(DICOMLoader._safe_float(first_value, 128.0))
             # 히스토그램 기반 자동 계산
             if self.original_pixel_array is not None:
                 return int(np.mean(self.original_pixel_array))
@@ -242,15 +316,21 @@ class DICOMLoader:
         return 0
             
     def get_default_window_width(self) -> int:
-        """기본 Window Width 반환"""
+        """기본 Window Width 반환 (파일당 한 번만 계산)"""
+        cached = self._meta_cache.get('window_width')
+        if cached is None:
+            cached = self._meta_cache['window_width'] = self._compute_default_window_width()
+        return cached
+        
+    def _compute_default_window_width(self) -> int:
+        """기본 Window Width 계산 (태그가 없으면 원본 전체를 훑음)"""
         try:
-            # DICOM 태그에서 Window Width 가져오기
-            if hasattr(self.dataset, 'WindowWidth'):
-                window_width = getattr(self.dataset, 'WindowWidth', None)
-                if window_width is not None:
-                    first_value = DICOMLoader._safe_get_first_value(window_width)
-                    if first_value is not None:
-                        return int(DICOMLoader._safe_float(first_value, 256.0))
+            # DICOM 태그에서 Window Width 가져오기 (getattr 한 번으로 존재 확인과 조회)
+            window_width = getattr(self.dataset, 'WindowWidth', None)
+            if window_width is not None:
+                first_value = DICOMLoader._safe_get_first_value(window_width)
+                if first_value is not None:
+                    return int(DICOMLoader._safe_float(first_value, 256.0))
             # 히스토그램 기반 자동 계산
             if self.original_pixel_array is not None:
                 return int(np.std(self.original_pixel_array) * 2)
@@ -258,12 +338,10 @@ class DICOMLoader:
             pass
         return 255
             
-    def apply_window_level(self, image: np.ndarray, window_level: int, window_width: int) -> np.ndarray:
-        """Window/Level 적용"""
-        if image is None:
-            return None
-            
-        # Rescale slope/intercept 적용
+    def get_window_coefficients(self, window_level: int, window_width: int) -> Tuple[float, float]:
+        """원본 픽셀 → 화면 값(0-255) 선형 변환 계수 (scale, offset), Rescale 포함"""
+        # Rescale slope/intercept
+        slope, intercept = 1.0, 0.0
         try:
             rescale_slope = getattr(self.dataset, 'RescaleSlope', None)
             rescale_intercept = getattr(self.dataset, 'RescaleIntercept', None)
@@ -271,24 +349,81 @@ class DICOMLoader:
             if rescale_slope is not None and rescale_intercept is not None:
                 slope = DICOMLoader._safe_float(rescale_slope, 1.0)
                 intercept = DICOMLoader._safe_float(rescale_intercept, 0.0)
-                image = image * slope + intercept
         except Exception as e:
             print(f"Rescale 처리 중 오류: {e}")
             
-        # Window/Level 적용
+        # Window/Level 범위
         min_val = window_level - window_width // 2
         max_val = window_level + window_width // 2
+        if max_val <= min_val:
+            return 0.0, 0.0
+            
+        # ((v * slope + intercept) - min) * 255 / (max - min) 를 v * scale + offset 으로 정리
+        k = 255.0 / (max_val - min_val)
+        scale = slope * k
+        offset = (intercept - min_val) * k
+        return scale, offset
         
-        # 클리핑
-        image = np.clip(image, min_val, max_val)
+    def apply_window_level(self, image: np.ndarray, window_level: int, window_width: int,
+                           out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Window/Level 적용 (내부 버퍼 재사용, out을 주면 그 배열에 기록)"""
+        if image is None:
+            return None
+        scale, offset = self.get_window_coefficients(window_level, window_width)
+        return self.apply_window_coefficients(image, scale, offset, out)
         
-        # 0-255 범위로 정규화
-        if max_val > min_val:
-            image = ((image - min_val) / (max_val - min_val) * 255).astype(np.uint8)
-        else:
-            image = np.zeros_like(image, dtype=np.uint8)
+    def apply_window_coefficients(self, image: np.ndarray, scale: float, offset: float,
+                                  out: Optional[np.ndarray] = None) -> np.ndarray:
+        """미리 계산한 선형 계수로 Window/Level 적용 (정수 픽셀은 LUT 조회, 그 외 제자리 연산)"""
+        if self._wl_out is None or self._wl_out.shape != image.shape:
+            self._wl_out = np.empty(image.shape, dtype=np.uint8)
+            self._wl_tmp = None
+        if out is None:
+            out = self._wl_out
             
-        return image
+        # 8/16비트 정수 픽셀: 가능한 모든 값에 대한 LUT를 만들고 픽셀당 조회 한 번으로 변환
+        if image.dtype.kind in 'iu' and image.dtype.itemsize <= 2:
+            index_dtype = np.dtype(f'u{image.dtype.itemsize}')
+            key = (scale, offset, image.dtype)
+            if key != self._wl_lut_key:
+                # 부호 없는 비트 패턴 순서로 실제 픽셀 값 나열 (int16은 view로 재해석)
+                values = np.arange(1 << (8 * image.dtype.itemsize), dtype=index_dtype).view(image.dtype)
+                lut = values * scale + offset
+                np.clip(lut, 0, 255, out=lut)
+                self._wl_lut = lut.astype(np.uint8)
+                self._wl_lut_key = key
+            np.take(self._wl_lut, image.view(index_dtype), out=out)
+            return out
+            
+        # 32비트 정수 픽셀: 실제 값 범위가 좁으면 [최솟값, 최댓값] 구간 LUT를 (픽셀 - 최솟값)으로 조회
+        if image.dtype.kind in 'iu':
+            if self._wl_range is None or self._wl_range[0] is not image:
+                self._wl_range = (image, int(image.min()), int(image.max()))
+            _, lo, hi = self._wl_range
+            if hi - lo < (1 << 16):
+                key = (scale, offset, image.dtype, lo, hi)
+                if key != self._wl_lut_key:
+                    lut = np.arange(lo, hi + 1, dtype=np.float64) * scale + offset
+                    np.clip(lut, 0, 255, out=lut)
+                    self._wl_lut = lut.astype(np.uint8)
+                    self._wl_lut_key = key
+                # 인덱스는 0..65535 이므로 uint16 버퍼 사용 (intp 대비 메모리 이동량 1/4)
+                if self._wl_idx is None or self._wl_idx.shape != image.shape:
+                    self._wl_idx = np.empty(image.shape, dtype=np.uint16)
+                np.subtract(image, lo, out=self._wl_idx, casting='unsafe')
+                np.take(self._wl_lut, self._wl_idx, out=out)
+                return out
+                
+        if self._wl_tmp is None:
+            self._wl_tmp = np.empty(image.shape, dtype=np.float32)
+            
+        # 단조 증가 변환이므로 변환 후 0-255로 클리핑한 결과는 먼저 클리핑한 결과와 동일
+        tmp = self._wl_tmp
+        np.multiply(image, scale, out=tmp, casting='unsafe')
+        np.add(tmp, offset, out=tmp)
+        np.clip(tmp, 0, 255, out=tmp)
+        np.copyto(out, tmp, casting='unsafe')
+        return out
         
     def get_pixel_spacing(self) -> Optional[Tuple[float, float]]:
         """픽셀 간격 반환"""
@@ -388,7 +523,14 @@ class DICOMLoader:
         return info
         
     def get_metadata(self) -> dict:
-        """전체 메타데이터 반환"""
+        """전체 메타데이터 반환 (처음 호출할 때 한 번만 수집)"""
+        metadata = self._meta_cache.get('metadata')
+        if metadata is None:
+            metadata = self._meta_cache['metadata'] = self._collect_metadata()
+        return metadata
+        
+    def _collect_metadata(self) -> dict:
+        """데이터셋 태그에서 메타데이터 수집"""
         return {
             'patient': self.get_patient_info(),
             'study': self.get_study_info(),
@@ -404,7 +546,12 @@ class DICOMLoader:
     def invert_image(self) -> np.ndarray:
         """이미지 반전"""
         if self.pixel_array is not None:
-            self.pixel_array = 255 - self.pixel_array
+            if np.may_share_memory(self.pixel_array, self.original_pixel_array):
+                # 원본과 버퍼를 공유하면 (리셋 직후/프로세스 간 전달 후) 새 배열로
+                self.pixel_array = 255 - self.pixel_array
+            else:
+                # 이미 편집용 사본이면 새 배열 할당 없이 제자리 반전 (뒤집기/회전 뷰도 그대로 기록)
+                np.subtract(255, self.pixel_array, out=self.pixel_array, casting='unsafe')
             return self.pixel_array
         return None
         
@@ -439,11 +586,18 @@ class DICOMLoader:
     def reset_image(self):
         """이미지 리셋"""
         if self.original_pixel_array is not None:
-            self.pixel_array = self.original_pixel_array.copy()
+            # 복사하지 않고 원본을 공유 (편집 함수는 공유 중이면 새 배열을 만듦)
+            self.pixel_array = self.original_pixel_array
             
     def get_histogram(self) -> Tuple[np.ndarray, np.ndarray]:
         """히스토그램 반환"""
-        if self.original_pixel_array is not None:
-            hist, bins = np.histogram(self.original_pixel_array.flatten(), bins=256, range=(0, 255))
-            return hist, bins
+        image = self.original_pixel_array
+        if image is not None:
+            if image.dtype == np.uint8:
+                # 8비트: 값이 곧 구간 번호이므로 구간 탐색 없이 개수만 셈
+                return np.bincount(image.ravel(), minlength=256), np.linspace(0, 255, 257)
+            # 그 외: 실제 값 범위를 256구간으로 (범위는 원본 배열당 한 번만 계산)
+            if self._hist_range is None or self._hist_range[0] is not image:
+                self._hist_range = (image, (image.min().item(), image.max().item()))
+            return np.histogram(image.ravel(), bins=256, range=self._hist_range[1])
         return None, None
@@ -47,15 +47,22 @@ class ImageLoader:
         if image_array is None:
             return None
             
+        # QImage는 배열 버퍼를 복사 없이 감싸므로 행 내부가 연속이어야 하고,
+        # 행 간격(strides[0])은 한 행 크기 이상의 양수여야 함 (상하 반전 뷰 등 음수 간격은 복사)
+        if image_array.strides[-1] != image_array.itemsize or (
+                image_array.ndim == 3 and image_array.strides[1] != image_array.strides[2] * image_array.shape[2]) or (
+                image_array.strides[0] < image_array.strides[1] * image_array.shape[1]):
+            image_array = np.ascontiguousarray(image_array)
+        bytes_per_line = image_array.strides[0]
+            
         # 이미지 형태 확인 및 변환
         if len(image_array.shape) == 2:
             # 그레이스케일 이미지
             height, width = image_array.shape
-            bytes_per_line = width
             
             # QImage 생성
             q_image = QImage(
-                image_array.data,
+                image_array.ctypes.data,
                 width,
                 height,
                 bytes_per_line,
@@ -64,12 +71,11 @@ class ImageLoader:
         elif len(image_array.shape) == 3:
             # 컬러 이미지
             height, width, channels = image_array.shape
-            bytes_per_line = channels * width
             
             if channels == 3:
                 # RGB 이미지
                 q_image = QImage(
-                    image_array.data,
+                    image_array.ctypes.data,
                     width,
                     height,
                     bytes_per_line,
@@ -78,7 +84,7 @@ class ImageLoader:
             elif channels == 4:
                 # RGBA 이미지
                 q_image = QImage(
-                    image_array.data,
+                    image_array.ctypes.data,
                     width,
                     height,
                     bytes_per_line,
@@ -89,7 +95,7 @@ class ImageLoader:
         else:
             raise ValueError(f"지원하지 않는 이미지 형태: {image_array.shape}")
             
-        # QPixmap으로 변환
+        # QPixmap으로 변환 (fromImage가 화면 포맷으로 복사하므로 반환 후 배열을 재사용해도 안전)
         return QPixmap.fromImage(q_image)
         
     def qpixmap_to_numpy(self, pixmap: QPixmap) -> np.ndarray:
@@ -6,8 +6,9 @@ JSON I/O for Keypoint Labeler
 import json
 import os
 import shutil
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from pathlib import Path
+import numpy as np
 
 
 class JSONIO:
@@ -48,17 +49,16 @@ class JSONIO:
             return []
             
     @staticmethod
-    def save_keypoints(file_path: str, keypoints: List[List[int]], 
+    def save_keypoints(file_path: str, keypoints: Union[List[List[int]], np.ndarray], 
                       additional_data: Optional[Dict[str, Any]] = None) -> bool:
-        """키포인트 JSON 파일 저장 (W, H 형식)"""
+        """키포인트 JSON 파일 저장 (W, H 형식, (N, 2) 배열도 허용)"""
+        temp_path = file_path + '.tmp'
         try:
-            # 백업 생성
-            JSONIO._create_backup(file_path)
-            
-            # W, H 형식으로 변환
-            w_h_keypoints = []
-            for x, y in keypoints:
-                w_h_keypoints.append([x, y])  # W=x, H=y
+            # W, H 형식으로 변환 (W=x, H=y) - 배열은 tolist() 한 번으로 변환
+            if isinstance(keypoints, np.ndarray):
+                w_h_keypoints = keypoints.reshape(-1, 2).tolist()
+            else:
+                w_h_keypoints = [[x, y] for x, y in keypoints]
             
             # 데이터 준비
             data = {
@@ -69,10 +69,17 @@ class JSONIO:
             if additional_data:
                 data.update(additional_data)
                 
+            # 직렬화 (들여쓰기 없는 압축 형식) - 디스크 내용과 같으면 백업/쓰기 생략
+            content = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            if JSONIO._read_bytes(file_path) == content:
+                return True
+                
+            # 백업 생성
+            JSONIO._create_backup(file_path)
+            
             # 임시 파일에 저장
-            temp_path = file_path + '.tmp'
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            with open(temp_path, 'wb') as f:
+                f.write(content)
                 
             # 원자적 교체
             if os.path.exists(file_path):
@@ -227,6 +234,15 @@ class JSONIO:
             
         return []
         
+    @staticmethod
+    def _read_bytes(file_path: str) -> Optional[bytes]:
+        """파일 내용 읽기 (없거나 읽을 수 없으면 None)"""
+        try:
+            with open(file_path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+            
     @staticmethod
     def _create_backup(file_path: str):
         """백업 파일 생성"""
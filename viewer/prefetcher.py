@@ -0,0 +1,141 @@
+"""
+Prefetcher for Keypoint Labeler
+이전/다음 이미지를 백그라운드에서 미리 디코딩
+"""
+
+import logging
+from collections import OrderedDict
+from concurrent.futures import Executor, Future
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from PyQt5.QtCore import QThread, QMutex, QMutexLocker, QWaitCondition
+
+from .dicom_loader import DICOMLoader
+from .image_loader import ImageLoader
+
+logger = logging.getLogger(__name__)
+
+
+def _decode_in_process(path: str) -> Tuple[np.ndarray, Optional[DICOMLoader]]:
+    """프로세스 풀 작업 함수 (피클 가능하도록 모듈 수준에 정의)"""
+    return Prefetcher.decode(path)
+
+
+class Prefetcher(QThread):
+    """이웃 파일 미리 로드 스레드 (LRU 캐시)
+
+    pool을 주면 DICOM 디코딩은 프로세스 풀에서 병렬로 수행하고,
+    일반 이미지는 이 스레드에서 디코딩한다.
+    """
+
+    def __init__(self, capacity: int = 3, pool: Optional[Executor] = None, parent=None):
+        """프리페처 초기화"""
+        super().__init__(parent)
+        self.capacity = capacity
+        self._pool = pool
+        self._cache = OrderedDict()  # path -> (image, dicom_loader 또는 None)
+        self._futures: Dict[str, Future] = {}  # 프로세스 풀에서 디코딩 중인 DICOM
+        self._pending = []
+        self._running = True
+        self._mutex = QMutex()
+        self._condition = QWaitCondition()
+
+    def request(self, paths: List[str]):
+        """미리 로드할 파일 목록 지정 (이전 요청은 대체됨)"""
+        submitted = []
+        with QMutexLocker(self._mutex):
+            paths = [p for p in paths if p not in self._cache]
+            if self._pool is not None:
+                # 더 이상 필요 없는 작업은 시작 전이면 취소
+                for path in list(self._futures):
+                    if path not in paths and self._futures[path].cancel():
+                        del self._futures[path]
+                for path in paths:
+                    if path.lower().endswith('.dcm') and path not in self._futures:
+                        future = self._pool.submit(_decode_in_process, path)
+                        self._futures[path] = future
+                        submitted.append((path, future))
+                paths = [p for p in paths if p not in self._futures]
+            self._pending = paths
+            self._condition.wakeOne()
+        # 이미 끝난 작업의 콜백은 즉시 호출되므로 뮤텍스를 놓은 뒤 등록
+        for path, future in submitted:
+            future.add_done_callback(lambda f, p=path: self._on_future_done(p, f))
+
+    def _on_future_done(self, path: str, future: Future):
+        """프로세스 풀 디코딩 완료 처리 (풀 관리 스레드에서 호출)"""
+        # 취소 콜백은 cancel()을 부른 스레드에서 뮤텍스를 잡은 채 호출됨
+        if future.cancelled():
+            return
+        with QMutexLocker(self._mutex):
+            if self._futures.get(path) is not future:
+                return
+            del self._futures[path]
+            error = future.exception()
+            if error is not None:
+                logger.warning("미리 로드 실패 %s: %s", path, error)
+                return
+            self._store(path, future.result())
+
+    def _store(self, path: str, entry: Tuple[np.ndarray, Optional[DICOMLoader]]):
+        """캐시에 추가 (뮤텍스를 잡은 상태에서 호출)"""
+        self._cache[path] = entry
+        self._cache.move_to_end(path)
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+
+    def take(self, path: str) -> Optional[Tuple[np.ndarray, Optional[DICOMLoader]]]:
+        """캐시된 이미지 반환 (없으면 None)"""
+        with QMutexLocker(self._mutex):
+            entry = self._cache.get(path)
+            if entry is not None:
+                self._cache.move_to_end(path)
+            return entry
+
+    def clear(self):
+        """캐시 및 대기 목록 초기화"""
+        with QMutexLocker(self._mutex):
+            self._cache.clear()
+            self._pending = []
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+
+    def stop(self):
+        """스레드 종료"""
+        with QMutexLocker(self._mutex):
+            self._running = False
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+            self._condition.wakeOne()
+        self.wait()
+
+    def run(self):
+        """대기 목록의 파일을 순서대로 디코딩"""
+        while True:
+            self._mutex.lock()
+            while self._running and not self._pending:
+                self._condition.wait(self._mutex)
+            if not self._running:
+                self._mutex.unlock()
+                return
+            path = self._pending.pop(0)
+            self._mutex.unlock()
+
+            try:
+                entry = self.decode(path)
+            except Exception as e:
+                logger.warning("미리 로드 실패 %s: %s", path, e)
+                continue
+
+            with QMutexLocker(self._mutex):
+                self._store(path, entry)
+
+    @staticmethod
+    def decode(path: str) -> Tuple[np.ndarray, Optional[DICOMLoader]]:
+        """파일 하나 디코딩 (image, DICOM이면 loader 아니면 None)"""
+        if path.lower().endswith('.dcm'):
+            loader = DICOMLoader(path)
+            return loader.get_image(), loader
+        return ImageLoader().load_image(path), None
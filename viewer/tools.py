@@ -9,31 +9,47 @@ import math
 from typing import List, Tuple, Optional, Dict, Any
 from pathlib import Path
 
+# 자연 정렬용 숫자 분할 정규식
+_NAT_RE = re.compile(r'(\d+)')
+
+# 지원 파일 확장자 (소문자, str.endswith에 바로 전달)
+SUPPORTED_EXTENSIONS = ('.dcm', '.jpg', '.jpeg', '.png')
+
 
 class Tools:
     """유틸리티 도구 클래스"""
     
     @staticmethod
-    def natural_sort_key(text: str) -> List:
+    def natural_sort_key(text: str) -> Tuple:
         """자연 정렬을 위한 키 함수"""
-        return [int(c) if c.isdigit() else c.lower() for c in re.split(r'(\d+)', text)]
+        return tuple(int(c) if c.isdigit() else c.lower() for c in _NAT_RE.split(text))
+        
+    @staticmethod
+    def natural_sort_paths(paths: List[str]) -> List[str]:
+        """파일명 기준 자연 정렬 (정렬 키는 파일당 한 번만 계산)"""
+        keys = [(Tools.natural_sort_key(os.path.basename(p)), p) for p in paths]
+        keys.sort()
+        return [p for _, p in keys]
+        
+    @staticmethod
+    def json_path_for(file_path: str) -> str:
+        """이미지 파일에 대응하는 JSON 경로 (Path 객체 생성 없이 문자열 연산만 사용)"""
+        return os.path.splitext(file_path)[0] + '.json'
         
     @staticmethod
     def get_supported_files(directory: str) -> List[str]:
         """지원하는 이미지 파일 목록 반환"""
-        supported_extensions = {'.dcm', '.jpg', '.jpeg', '.png'}
-        
         files = []
         try:
-            for file_path in Path(directory).iterdir():
-                if file_path.is_file() and file_path.suffix.lower() in supported_extensions:
-                    files.append(str(file_path))
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.lower().endswith(SUPPORTED_EXTENSIONS) and entry.is_file():
+                        files.append(entry.path)
         except Exception as e:
             print(f"파일 목록 조회 오류: {e}")
             
         # 자연 정렬
-        files.sort(key=Tools.natural_sort_key)
-        return files
+        return Tools.natural_sort_paths(files)
         
     @staticmethod
     def calculate_distance(point1: List[int], point2: List[int]) -> float:
@@ -43,7 +59,7 @@ class Tools:
             
         dx = point1[0] - point2[0]
         dy = point1[1] - point2[1]
-        return math.sqrt(dx * dx + dy * dy)
+        return math.hypot(dx, dy)
         
     @staticmethod
     def find_closest_point(target: List[int], points: List[List[int]]) -> Tuple[int, float]:
@@ -51,16 +67,19 @@ class Tools:
         if not points:
             return -1, float('inf')
             
-        min_distance = float('inf')
+        # 제곱 거리로 비교하고 제곱근은 마지막에 한 번만 계산
+        min_distance_sq = float('inf')
         closest_index = -1
+        tx, ty = target
         
-        for i, point in enumerate(points):
-            distance = Tools.calculate_distance(target, point)
-            if distance < min_distance:
-                min_distance = distance
+        for i, (x, y) in enumerate(points):
+            dx, dy = x - tx, y - ty
+            distance_sq = dx * dx + dy * dy
+            if distance_sq < min_distance_sq:
+                min_distance_sq = distance_sq
                 closest_index = i
                 
-        return closest_index, min_distance
+        return closest_index, math.sqrt(min_distance_sq)
         
     @staticmethod
     def validate_coordinates(x: int, y: int, image_width: int, image_height: int) -> Tuple[int, int]: